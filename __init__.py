@@ -5,7 +5,9 @@ bl_info = {
     'blender': (2, 90, 0)
 }
 
-moduleNames = ['import']
+# Only Blender-specific modules are listed here. They are imported on `register`, so importing the package
+# itself stays cheap and works without Blender (e.g. in worker processes using `core`).
+moduleNames = ['builder', 'batch', 'import', 'export']
 moduleFullNames = []
 
 import sys
@@ -14,20 +16,17 @@ import importlib
 for moduleName in moduleNames:
     moduleFullNames.append('{}.{}'.format(__name__, moduleName))
 
-for moduleFullName in moduleFullNames:
-    if moduleFullName in sys.modules:
-        importlib.reload(sys.modules[moduleFullName])
-    else:
-        globals()[moduleFullName] = importlib.import_module(moduleFullName)
-
 def register():
     for moduleName in moduleFullNames:
         if moduleName in sys.modules:
-            if hasattr(sys.modules[moduleName], 'register'):
-                sys.modules[moduleName].register()
+            importlib.reload(sys.modules[moduleName])
+        else:
+            importlib.import_module(moduleName)
+        if hasattr(sys.modules[moduleName], 'register'):
+            sys.modules[moduleName].register()
 
 def unregister():
-    for moduleName in moduleFullNames:
+    for moduleName in reversed(moduleFullNames):
         if moduleName in sys.modules:
             if hasattr(sys.modules[moduleName], 'unregister'):
                 sys.modules[moduleName].unregister()
@@ -0,0 +1,124 @@
+import os
+import time
+import traceback
+from concurrent import futures
+from pathlib import Path
+
+from .core import model
+from .core import texture
+from .core import workers
+from .core import profiling
+from . import builder
+
+class ImportResult:
+
+    def __init__(self, path, decode_time=0., build_time=0., error=None):
+        self.path = path
+        self.decode_time = decode_time
+        self.build_time = build_time
+        self.error = error
+
+    def __str__(self):
+        if self.error is not None:
+            return f'{self.path}: failed ({self.error})'
+        return f'{self.path}: decoded in {self.decode_time:.3f}s, built in {self.build_time:.3f}s'
+
+
+class TextureDecoder:
+    """
+        Decodes lazy `TexturePixels` of a batch in the worker pool, once per texture key.
+
+        Decoding starts when a model arrives and is joined when the texture's image is first built. Later
+        uses of the same key (and textures which images exist already) get the texture still undecoded,
+        the builder finds its image by key.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._jobs = {}
+
+    def submit(self, textures):
+        for pixels in textures:
+            if not isinstance(pixels, texture.TexturePixels) or pixels.key in self._jobs:
+                continue
+            self._jobs[pixels.key] = None if builder.has_image(pixels) else \
+                workers.submit(texture.decode_pixels, pixels, max_workers=self.max_workers)
+
+    def get_texture(self, textures, resource):
+        pixels = textures.get(resource)
+        job = self._jobs.get(pixels.key) if isinstance(pixels, texture.TexturePixels) else None
+        if job is None:
+            return pixels
+        self._jobs[pixels.key] = None
+        with profiling.span('texture.wait'):
+            return job.result()
+
+    def close(self):
+        for job in self._jobs.values():
+            if job is not None:
+                job.cancel()
+
+
+def find_models(directory, recursive=False):
+    directory = Path(directory)
+    return sorted(directory.rglob('*.xdb') if recursive else directory.glob('*.xdb'))
+
+
+def import_files(paths, lod_ids=None, slots_load=False, texture_cache=None, max_workers=None, xdb_cache=None,
+                 resource_index=None, skin_load=True, normals_load=True, update_existing=True,
+                 textures_in_memory=False):
+    """
+        Import many geometry files at once.
+
+        Files are decoded (and their textures converted) in a pool of worker processes, finished models
+        are streamed back and assembled into Blender datablocks on the calling thread. A failing file
+        doesn't stop the batch, its error is stored in the returned `ImportResult`.
+
+        Textures decoded in memory (`textures_in_memory`) aren't decoded by the model jobs: models only
+        carry their content keys and each texture is decoded once per batch by its own job, see
+        `TextureDecoder`. Textures shared by many files are neither decoded nor transferred again.
+    """
+    paths = [Path(path) for path in paths]
+    max_jobs = 2 * min(max_workers or os.cpu_count(), len(paths))
+    results = []
+
+    queued, jobs = iter(paths), {}
+    texture_decoder = TextureDecoder(max_workers)
+    try:
+        while True:
+            # Keep a bounded number of jobs in flight, so decoded models don't pile up in memory
+            for path in queued:
+                jobs[workers.submit(model.load_model_job, path, lod_ids, texture_cache, xdb_cache, resource_index,
+                                    textures_in_memory, True, max_workers=max_workers)] = path
+                if len(jobs) >= max_jobs:
+                    break
+            if len(jobs) == 0:
+                break
+
+            done, _ = futures.wait(jobs, return_when=futures.FIRST_COMPLETED)
+            done = [(jobs.pop(job), job) for job in done]
+            # Textures of all finished models start decoding before any of them is built
+            for _, job in done:
+                if job.exception() is None:
+                    texture_decoder.submit(job.result()[0].textures.values())
+            for path, job in done:
+                try:
+                    model_data, decode_time = job.result()
+                    if len(model_data.lod_ids) == 0:
+                        raise ValueError('No LODs to be found')
+                    start = time.perf_counter()
+                    get_texture = lambda resource: texture_decoder.get_texture(model_data.textures, resource)
+                    builder.build_model(model_data, get_texture, slots_load, skin_load, normals_load,
+                                        update_existing)
+                    result = ImportResult(path, decode_time, time.perf_counter() - start)
+                except Exception as e:
+                    if not isinstance(e, model.NotGeometryError):
+                        traceback.print_exc()
+                    result = ImportResult(path, error=e)
+                print(result)
+                results.append(result)
+    finally:
+        for job in jobs:
+            job.cancel()
+        texture_decoder.close()
+    return results
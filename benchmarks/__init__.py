@@ -0,0 +1,5 @@
+"""
+    Benchmarks of the import stages on synthetic assets.
+
+    Run with plain Python from the folder containing the addon: `python -m <addon folder>.benchmarks --help`
+"""
@@ -0,0 +1,199 @@
+import argparse
+import gc
+import json
+import platform
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from .. import bl_info
+from ..core import xdb
+from ..core import blob
+from ..core import geometry
+from ..core import vertex
+from ..core import skeleton
+from ..core import texture
+from . import synthetic
+
+
+def measure(stage, fn, repeat, amount, unit, **params):
+    """
+        Time `fn` `repeat` times, then run it once more under `tracemalloc` for peak memory.
+    """
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'stage': stage,
+        'params': params,
+        'best': best,
+        'median': statistics.median(timings),
+        'throughput': amount / best if best > 0 else float('inf'),
+        'unit': f'{unit}/s',
+        'peak_memory': peak_memory,
+    }
+
+
+def benchmark_model(path, repeat, workdir, **params):
+    parser = xdb.XdbParser(path)
+    bin_parser = blob.BinParser(path.with_suffix('.bin'))
+    vertex_buffer = bin_parser.get_buffer(parser.get_vertex_buffer())
+    index_buffer = bin_parser.get_buffer(parser.get_index_buffer())
+    skeleton_buffer = bin_parser.get_buffer(parser.get_skeleton())
+    converter = vertex.VertexBinConverter(parser.get_vertex_declarations()[0])
+    vertex_count = len(vertex_buffer) // converter.vertex_declaration.stride
+    vertices = converter.bin_to_arrays(vertex_buffer)
+    fragments = [lod for model_element in parser.get_model_elements() for lod in model_element.lods]
+    index_count = max(fragment.index_buffer_end for fragment in fragments)
+    triangles = geometry.decode_indices(index_buffer, vertex_count, index_count)
+    bone_ids = skeleton.BoneBinParser(skeleton_buffer).get_skeleton().ids
+    bone_count = len(bone_ids)
+
+    def parse_xdb():
+        xdb_parser = xdb.XdbParser(path)
+        xdb_parser.get_vertex_declarations()
+        xdb_parser.get_model_elements()
+        xdb_parser.get_vertex_buffer(), xdb_parser.get_index_buffer(), xdb_parser.get_skeleton()
+
+    xdb_cache = xdb.XdbCache(Path(workdir) / 'xdb_cache')
+    xdb.XdbParser(path, xdb_cache)
+
+    def parse_xdb_cached():
+        xdb_parser = xdb.XdbParser(path, xdb_cache)
+        xdb_parser.get_vertex_declarations()
+        xdb_parser.get_model_elements()
+        xdb_parser.get_vertex_buffer(), xdb_parser.get_index_buffer(), xdb_parser.get_skeleton()
+
+    def parse_bin_lazy():
+        lazy_parser = blob.BinParser(path.with_suffix('.bin'),
+                                     [parser.get_vertex_buffer(), parser.get_index_buffer(), parser.get_skeleton()])
+        lazy_parser.get_buffer(parser.get_vertex_buffer())
+
+    def extract_lods():
+        for fragment in fragments:
+            geometry.extract_lod(vertices, triangles, fragment)
+
+    def group_skin_weights():
+        # Declarations store fewer weights than indices too (implied last weight)
+        for _ in geometry.group_skin_weights(vertices.indices, vertices.weights, bone_ids):
+            pass
+
+    bin_size = path.with_suffix('.bin').stat().st_size
+    return [
+        measure('XdbParser', parse_xdb, repeat, path.stat().st_size, 'B', **params),
+        measure('XdbParser (cached)', parse_xdb_cached, repeat, path.stat().st_size, 'B', **params),
+        measure('BinParser', lambda: blob.BinParser(path.with_suffix('.bin')), repeat, bin_size, 'B', **params),
+        measure('BinParser (lazy)', parse_bin_lazy, repeat, bin_size, 'B', **params),
+        measure('VertexBinConverter.bin_to_vertices', lambda: converter.bin_to_vertices(vertex_buffer),
+                repeat, vertex_count, 'vertices', **params),
+        measure('VertexBinConverter.bin_to_arrays', lambda: converter.bin_to_arrays(vertex_buffer),
+                repeat, vertex_count, 'vertices', **params),
+        measure('index decoding', lambda: geometry.decode_indices(index_buffer, vertex_count, index_count),
+                repeat, triangles.size, 'indices', **params),
+        # 16-bit indices stay 16-bit over a larger shared vertex buffer (elements with vertex offsets)
+        measure('index decoding (large vertex buffer)',
+                lambda: geometry.decode_indices(index_buffer, max(vertex_count, 1 << 17), index_count),
+                repeat, triangles.size, 'indices', **params),
+        measure('LOD remapping', extract_lods, repeat, sum(f.index_buffer_end - f.index_buffer_begin for f in fragments),
+                'indices', **params),
+        measure('skin weight grouping', group_skin_weights, repeat, vertex_count, 'vertices', **params),
+        measure('BoneBinParser.get_bones', lambda: skeleton.BoneBinParser(skeleton_buffer).get_bones(),
+                repeat, bone_count, 'bones', **params),
+        measure('BoneBinParser.get_skeleton', lambda: skeleton.BoneBinParser(skeleton_buffer).get_skeleton(),
+                repeat, bone_count, 'bones', **params),
+    ]
+
+
+def benchmark_texture(path, repeat, width, height, type):
+    binary = path.with_suffix('.bin').read_bytes()
+    level = texture.read_mip_chain(binary)[0]
+    return [measure('bin2dds', lambda: texture.bin2dds(binary, width, height, type), repeat,
+                    len(texture.bin2dds(binary, width, height, type)), 'B', width=width, height=height, type=type),
+            measure('decode_dxt', lambda: texture.decode_dxt(level, width, height, type), repeat,
+                    width * height, 'pixels', width=width, height=height, type=type)]
+
+
+def run(args, workdir):
+    results = []
+    for declaration in range(len(synthetic.DECLARATIONS)):
+        for vertex_count in args.vertices:
+            params = dict(declaration=declaration, vertices=vertex_count, elements=args.elements, lods=args.lods,
+                          bones=args.bones)
+            print(f'Model {params}')
+            path = synthetic.write_model(workdir, f'models/model_{declaration}_{vertex_count}.xdb', vertex_count,
+                                         args.elements, args.lods, args.bones, declaration)
+            results += benchmark_model(path, args.repeat, workdir, **params)
+
+    for type in args.texture_types:
+        for size in args.texture_sizes:
+            print(f'Texture {type} {size}x{size}')
+            path = synthetic.write_texture(workdir, f'textures/{type}_{size}.xdb', size, size, type)
+            results += benchmark_texture(path, args.repeat, size, size, type)
+    return results
+
+
+def compare(results, baseline):
+    reference = {(entry['stage'], json.dumps(entry['params'], sort_keys=True)): entry for entry in baseline['results']}
+    for entry in results:
+        old = reference.get((entry['stage'], json.dumps(entry['params'], sort_keys=True)))
+        if old is not None:
+            entry['baseline_ratio'] = entry['best'] / old['best'] if old['best'] > 0 else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark Allods import stages on synthetic assets')
+    parser.add_argument('--vertices', type=int, nargs='+', default=[10000, 60000], help='vertex counts of models')
+    parser.add_argument('--elements', type=int, default=4, help='model elements per model')
+    parser.add_argument('--lods', type=int, default=3, help='LODs per model element')
+    parser.add_argument('--bones', type=int, default=200, help='bones per skeleton')
+    parser.add_argument('--texture-sizes', type=int, nargs='+', default=[512, 2048], help='texture sizes')
+    parser.add_argument('--texture-types', nargs='+', default=['DXT1', 'DXT5'], help='texture formats')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per stage')
+    parser.add_argument('--output', type=Path, default=Path('benchmark.json'), help='JSON file with results')
+    parser.add_argument('--baseline', type=Path, help='earlier results to compare with')
+    parser.add_argument('--workdir', type=Path, help='where to generate assets (temporary folder by default)')
+    args = parser.parse_args(argv)
+
+    if args.workdir is not None:
+        results = run(args, args.workdir)
+    else:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = run(args, workdir)
+
+    if args.baseline is not None:
+        compare(results, json.loads(args.baseline.read_text()))
+
+    report = {
+        'version': '.'.join(map(str, bl_info['version'])),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+
+    for entry in results:
+        ratio = f"  x{entry['baseline_ratio']:.2f}" if entry.get('baseline_ratio') else ''
+        print(f"{entry['stage']:<40} {entry['best'] * 1000:>10.2f} ms {entry['throughput']:>14.0f} {entry['unit']:<12}"
+              f" {entry['peak_memory'] / 2 ** 20:>8.1f} MiB  {entry['params']}{ratio}")
+    print(f'Results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
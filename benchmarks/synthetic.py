@@ -0,0 +1,171 @@
+"""
+    Generator of synthetic Allods assets (`.xdb` + `.bin` pairs) for benchmarks.
+"""
+import struct
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from ..core import vertex
+from ..core import texture
+
+T = vertex.VertexElementType
+
+# Together the declarations use every `VertexElementType`
+DECLARATIONS = [
+    {
+        'position': (T.FLOAT3, 0), 'normal': (T.SHORT4, 12), 'color': (T.COLOR4, 20), 'texcoord0': (T.FLOAT2, 24),
+        'texcoord1': (T.HALF4, 32), 'weights': (T.UBYTE4, 40), 'indices': (T.UBYTE4, 44), 'stride': 48
+    },
+    {
+        'position': (T.FLOAT4, 0), 'normal': (T.FLOAT3, 16), 'color': (T.UNUSED, 0), 'texcoord0': (T.SHORT2, 28),
+        'texcoord1': (T.USHORT2, 32), 'weights': (T.FLOAT1, 36), 'indices': (T.USHORT4, 40), 'stride': 48
+    },
+]
+
+
+def make_vertex_declaration(declaration):
+    components = {name: vertex.VertexComponent(*declaration[name]) for name in vertex.VERTEX_ATTRIBUTES}
+    return vertex.VertexDeclaration(stride=declaration['stride'], **components)
+
+
+def make_vertex_buffer(declaration, count, bone_count, rng):
+    records = np.zeros(count, dtype=vertex.VertexBinConverter(make_vertex_declaration(declaration)).get_dtype())
+    for name in records.dtype.names:
+        field = records[name]
+        if name == 'indices':
+            field[...] = rng.integers(0, max(bone_count, 1), field.shape)
+        elif name == 'weights' and field.dtype.kind == 'u':
+            field[...] = 0
+            field[..., 0] = np.iinfo(field.dtype).max
+        elif field.dtype.kind == 'f':
+            field[...] = rng.uniform(-1., 1., field.shape)
+        else:
+            limits = np.iinfo(field.dtype)
+            field[...] = rng.integers(limits.min, limits.max, field.shape, endpoint=True)
+    return records.tobytes()
+
+
+def make_triangles(begin, end, count, rng):
+    # Every vertex of the range is used once, the rest is random
+    triangles = rng.integers(begin, end, count * 3)
+    used = min(end - begin, len(triangles))
+    triangles[:used] = np.arange(begin, begin + used)
+    return triangles
+
+
+def make_skeleton(bone_count, rng):
+    """
+        Skeleton blob in layout read by `BoneBinParser`: header with offsets (relative to their field),
+        bones list, names table, local matrices, ids.
+    """
+    parents = [65535] + [int(rng.integers(0, i)) for i in range(1, bone_count)]
+    names = [(f'Slot{i}' if i % 10 == 9 else f'Bone{i}').encode('utf-8') + b'\x00' for i in range(bone_count)]
+
+    bones_list, local_list, name_entries = bytearray(), bytearray(), bytearray()
+    for i in range(bone_count):
+        translation = rng.uniform(-1., 1., 3)
+        bones_list += struct.pack('12fI', 1, 0, 0, 0, 1, 0, 0, 0, 1, *(-translation), parents[i])
+        local_list += struct.pack('12f', 1, 0, 0, 0, 1, 0, 0, 0, 1, *translation)
+    name_offset = 8 * bone_count
+    for i, name in enumerate(names):
+        name_entries += struct.pack('II', name_offset - i * 8, len(name))
+        name_offset += len(name)
+    names_section = bytes(name_entries) + b''.join(names)
+    ids = struct.pack(f'{bone_count}H', *range(bone_count))
+
+    list_offset = 32
+    names_offset = list_offset + len(bones_list)
+    local_offset = names_offset + len(names_section)
+    ids_offset = local_offset + len(local_list)
+    header = struct.pack('8I', list_offset, bone_count, names_offset - 8, bone_count,
+                         ids_offset - 16, bone_count, local_offset - 24, bone_count)
+    return header + bytes(bones_list) + names_section + bytes(local_list) + ids
+
+
+def make_blobs(blobs):
+    return zlib.compress(b''.join(struct.pack('II', i, len(blob)) + blob for i, blob in enumerate(blobs)))
+
+
+def make_texture(width, height, type, rng):
+    """
+        Texture `.bin`: zlib header followed by raw deflate stream of the mip chain (smallest level first).
+    """
+    levels = []
+    while len(levels) == 0 or min(width >> len(levels), height >> len(levels)) >= 4:
+        levels.append(rng.bytes(texture.get_mip_size(width, height, len(levels), type)))
+    payload = b''.join(struct.pack('2i', len(levels) - 1 if i == 0 else i, len(level)) + level
+                       for i, level in enumerate(reversed(levels)))
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    return b'\x78\x9c' + compressor.compress(payload) + compressor.flush()
+
+
+def write_texture(root, resource, width=1024, height=1024, type='DXT5', seed=0):
+    rng = np.random.default_rng(seed)
+    path = Path(root) / resource
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.with_suffix('.bin').write_bytes(make_texture(width, height, type, rng))
+    path.write_text(f'<Texture><binaryFile href="/{Path(resource).with_suffix(".bin").as_posix()}"/>'
+                    f'<width>{width}</width><height>{height}</height><type>{type}</type></Texture>')
+    return path
+
+
+def write_model(root, resource, vertex_count=10000, element_count=4, lod_count=3, bone_count=64,
+                declaration=0, texture_resource=None, seed=0):
+    """
+        Write geometry resource `resource` (path relative to `root`) with its `.bin`.
+
+        Vertices are split evenly between model elements, each LOD has half the triangles of the previous one.
+    """
+    rng = np.random.default_rng(seed)
+    path = Path(root) / resource
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    declaration = DECLARATIONS[declaration]
+    vertex_buffer = make_vertex_buffer(declaration, vertex_count, bone_count, rng)
+
+    chunks, fragments, index_count = [], [], 0
+    per_element = vertex_count // element_count
+    for element in range(element_count):
+        begin, end = element * per_element, (element + 1) * per_element
+        element_fragments = []
+        for lod in range(lod_count):
+            triangles = make_triangles(begin, end, max(1, 2 * per_element >> lod), rng)
+            chunks.append(triangles)
+            element_fragments.append((begin, end, index_count, index_count + len(triangles)))
+            index_count += len(triangles)
+        fragments.append(element_fragments)
+    index_type = '<u2' if vertex_count <= 65536 else '<u4'
+    index_buffer = np.concatenate(chunks).astype(index_type).tobytes()
+    skeleton_buffer = make_skeleton(bone_count, rng)
+
+    path.with_suffix('.bin').write_bytes(make_blobs([vertex_buffer, index_buffer, skeleton_buffer]))
+    path.write_text(_make_geometry_xml(Path(resource).with_suffix('.bin').as_posix(), declaration, fragments,
+                                       texture_resource, [len(vertex_buffer), len(index_buffer), len(skeleton_buffer)]))
+    return path
+
+
+def _make_geometry_xml(binary_file, declaration, fragments, texture_resource, sizes):
+    components = ''.join(f'<{name}><offset>{declaration[name][1]}</offset><type>{declaration[name][0].name}</type></{name}>'
+                         for name in vertex.VERTEX_ATTRIBUTES)
+    diffuse = f'/{texture_resource}#xpointer(/Texture)' if texture_resource else ''
+    elements = ''
+    for i, element_fragments in enumerate(fragments):
+        lods = ''.join(f'<Item><vertexBufferBegin>{a}</vertexBufferBegin><vertexBufferEnd>{b}</vertexBufferEnd>'
+                       f'<indexBufferBegin>{c}</indexBufferBegin><indexBufferEnd>{d}</indexBufferEnd></Item>'
+                       for a, b, c, d in element_fragments)
+        elements += (f'<Item><lods>{lods}</lods>'
+                     f'<material><BlendEffect>BLEND_EFFECT_ALPHA</BlendEffect><diffuseTexture href="{diffuse}"/>'
+                     f'<scrollAlpha>false</scrollAlpha><ScrollRGB>false</ScrollRGB><transparencyTexture href=""/>'
+                     f'<transparent>false</transparent><useFog>true</useFog><uTranslateSpeed>0</uTranslateSpeed>'
+                     f'<visible>true</visible><vTranslateSpeed>0</vTranslateSpeed></material>'
+                     f'<materialName>material{i}</materialName><name>element{i}</name><skinIndex>0</skinIndex>'
+                     f'<vertexBufferOffset>0</vertexBufferOffset><vertexDeclarationID>0</vertexDeclarationID>'
+                     f'<virtualOffset>0</virtualOffset></Item>')
+    return (f'<Geometry><binaryFile href="/{binary_file}"/>'
+            f'<vertexDeclarations><Item>{components}<stride>{declaration["stride"]}</stride></Item></vertexDeclarations>'
+            f'<vertexBuffer><localID>0</localID><size>{sizes[0]}</size></vertexBuffer>'
+            f'<indexBuffer><localID>1</localID><size>{sizes[1]}</size></indexBuffer>'
+            f'<skeleton><localID>2</localID><size>{sizes[2]}</size></skeleton>'
+            f'<modelElements>{elements}</modelElements></Geometry>')
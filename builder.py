@@ -0,0 +1,387 @@
+import bpy
+
+import numpy as np
+
+from pathlib import Path
+
+from .core.geometry import get_geometry_key, group_skin_weights
+from .core.skeleton import NO_PARENT
+from .core.texture import TexturePixels
+from .core import profiling
+
+
+def build_model(model, get_texture, slots_load=False, skin_load=True, normals_load=True, update_existing=True):
+    """
+        Assemble decoded `ModelData` into collections, meshes, materials and armature.
+
+        `get_texture` maps diffuse texture resource to converted texture file or decoded `TexturePixels`.
+        With `skin_load` meshes get vertex groups from their skin weights and are bound to the armature,
+        with `normals_load` decoded normals are kept as custom normals.
+        LODs with identical geometry share one mesh datablock. With `update_existing` a model imported
+        before from the same file is updated in place, see `build_model_steps`.
+    """
+    for collection in build_model_steps(model, get_texture, slots_load, skin_load, normals_load,
+                                        update_existing):
+        pass
+    return collection
+
+
+def get_build_step_count(model):
+    return 1 + (len(model.skeleton) > 0) + sum(len(lods) for lods in model.lods)
+
+
+def get_source(model):
+    return str(Path(model.path).resolve())
+
+
+def find_model_collection(source):
+    """
+        Collection of a model imported from `source` file and still present in the scene.
+    """
+    for collection in bpy.data.collections:
+        if collection.get('allods_source') == source and collection.users > 0:
+            return collection
+    return None
+
+
+def build_model_steps(model, get_texture, slots_load=False, skin_load=True, normals_load=True,
+                      update_existing=True):
+    """
+        `build_model` split into `get_build_step_count(model)` steps, so it can be spread over time.
+
+        Yields the model collection after each step: collections, armature and every LOD object.
+
+        Imported datablocks are tagged with the source file and hashes of the data they were built from.
+        When the model collection of the same file is found (and `update_existing` is set), only objects
+        which element, LOD geometry, material or skeleton changed are rebuilt, the others are kept as
+        they are. Objects of elements and LODs no longer imported are removed.
+    """
+    source = get_source(model)
+    collection = find_model_collection(source) if update_existing else None
+    if collection is None:
+        collection = bpy.data.collections.new(model.name)
+        collection['allods_source'] = source
+        bpy.context.scene.collection.children.link(collection)
+
+    lods_collections = {child['allods_lod']: child for child in collection.children if 'allods_lod' in child}
+    for lod_id in model.lod_ids:
+        if lod_id not in lods_collections:
+            lod_collection = bpy.data.collections.new(f"{model.name}_lod{lod_id}")
+            lod_collection['allods_lod'] = lod_id
+            collection.children.link(lod_collection)
+            lods_collections[lod_id] = lod_collection
+    existing = {obj.get('allods_element'): obj for obj in collection.all_objects if 'allods_element' in obj}
+    yield collection
+
+    skeleton_key = model.skeleton.get_key() + f'|{slots_load}' if len(model.skeleton) > 0 else None
+    armature_obj = existing.pop('skeleton', None)
+    if armature_obj is not None and armature_obj.get('allods_hash') != skeleton_key:
+        remove_object(armature_obj)
+        armature_obj = None
+    if len(model.skeleton) > 0:
+        if armature_obj is None:
+            with profiling.span('build.armature'):
+                armature_obj = build_armature(collection, model.skeleton, slots_load)
+            armature_obj['allods_element'] = 'skeleton'
+            armature_obj['allods_hash'] = skeleton_key
+        yield collection
+
+    meshes = {}
+    rebuilt = 0
+    for index, (model_element, lods) in enumerate(zip(model.model_elements, model.lods)):
+        # Load material & texture
+        image = None
+        if len(model_element.material.diffuse_texture) > 0:
+            image = get_texture(model_element.material.diffuse_texture)
+            print(f'Loading texture: {model_element.material.diffuse_texture}')
+        with profiling.span('build.material'):
+            mat = get_material(model_element.material_name, image)
+
+        # Building lods
+        for lod_id, (lod_vertices, lod_indices) in lods.items():
+            name = model_element.name + '_lod' + str(lod_id)
+            element = f'{index}|{model_element.name}|{lod_id}'
+            key = get_geometry_key(lod_vertices, lod_indices)
+            skinned = skin_load and armature_obj is not None
+            object_key = f'{key}|{normals_load}|{skeleton_key if skinned else None}'
+
+            obj = existing.pop(element, None)
+            if obj is not None and obj.get('allods_hash') == object_key:
+                meshes.setdefault(key, obj.data)
+            else:
+                rebuilt += 1
+                mesh = meshes.get(key)
+                shared = mesh is not None
+                if not shared:
+                    with profiling.span('build.mesh'):
+                        mesh = meshes[key] = build_mesh(name, lod_vertices, lod_indices, normals_load)
+                    mesh.materials.append(mat)
+                if obj is None:
+                    obj = bpy.data.objects.new(name, mesh)
+                    obj['allods_element'] = element
+                    lods_collections[lod_id].objects.link(obj)
+                else:
+                    replace_mesh(obj, mesh)
+                obj['allods_hash'] = object_key
+                if skinned:
+                    with profiling.span('build.skin'):
+                        bind_skin(obj, armature_obj, model.skeleton, lod_vertices, not shared)
+
+            if obj.material_slots[0].material != mat:
+                # Instances of one mesh may still differ in material, link it to the object then
+                obj.material_slots[0].link = 'OBJECT'
+                obj.material_slots[0].material = mat
+            yield collection
+
+    for obj in existing.values():
+        remove_object(obj)
+    for lod_id, lod_collection in lods_collections.items():
+        if lod_id not in model.lod_ids and len(lod_collection.all_objects) == 0:
+            bpy.data.collections.remove(lod_collection)
+    print(f'{model.name}: {rebuilt} of {sum(len(lods) for lods in model.lods)} objects (re)built')
+
+
+def replace_mesh(obj, mesh):
+    """
+        Point `obj` at new `mesh`, dropping skinning and the old mesh when nothing else uses it.
+
+        Weights (and since Blender 3.0 group names) are stored in the mesh, so groups are cleared only
+        when the old mesh isn't shared, before it's swapped.
+    """
+    old_mesh = obj.data
+    if old_mesh.users == 1:
+        obj.vertex_groups.clear()
+    obj.data = mesh
+    for modifier in [modifier for modifier in obj.modifiers if modifier.type == 'ARMATURE']:
+        obj.modifiers.remove(modifier)
+    obj.parent = None
+    if old_mesh.users == 0:
+        bpy.data.meshes.remove(old_mesh)
+
+
+def remove_object(obj):
+    data = obj.data
+    bpy.data.objects.remove(obj)
+    if isinstance(data, bpy.types.Mesh) and data.users == 0:
+        bpy.data.meshes.remove(data)
+    elif isinstance(data, bpy.types.Armature) and data.users == 0:
+        bpy.data.armatures.remove(data)
+
+
+def remove_collection(collection):
+    """
+        Remove collection with its children, objects and their no longer used meshes and armatures.
+    """
+    for child in list(collection.children):
+        remove_collection(child)
+    for obj in list(collection.objects):
+        remove_object(obj)
+    bpy.data.collections.remove(collection)
+
+
+def build_armature(collection, skeleton, slots_load=False):
+    """
+        Create armature with edit bones from decoded `Skeleton`.
+
+        Bone tails are taken from world matrices computed for the whole skeleton at once, heads are
+        attached to the nearest loaded ancestor.
+    """
+    armature = bpy.data.armatures.new("skeleton")
+    armature_obj = bpy.data.objects.new("skeleton", armature)
+    collection.objects.link(armature_obj)
+
+    bpy.context.view_layer.objects.active = armature_obj
+    bpy.ops.object.mode_set(mode='EDIT')
+
+    loaded = [slots_load or "Slot" not in name for name in skeleton.names]
+    parents = skeleton.parents.tolist()
+    tails = skeleton.get_world_matrices()[:, 3, :3].tolist()
+
+    bones_obj = {}
+    for i, name in enumerate(skeleton.names):
+        if loaded[i]:
+            bone_obj = armature_obj.data.edit_bones.new(name)
+            bone_obj.tail = tails[i]
+            bones_obj[i] = bone_obj
+
+    for i, bone_obj in bones_obj.items():
+        parent = parents[i]
+        while parent != NO_PARENT and not loaded[parent]:
+            parent = parents[parent]
+        if parent != NO_PARENT:
+            bone_obj.head = bones_obj[parent].tail
+            bone_obj.parent = bones_obj[parent]
+
+    bpy.ops.object.mode_set(mode='OBJECT')
+    return armature_obj
+
+
+def bind_skin(obj, armature_obj, skeleton, vertices, assign_weights=True):
+    """
+        Create vertex groups from per-vertex bone indices and weights and deform `obj` with the armature.
+
+        Vertices sharing bone and weight are added to the group with a single call, instead of one call
+        per vertex influence. Weights are stored in the mesh, so for a mesh already bound by another
+        object `assign_weights` is off: since Blender 3.0 the mesh has the groups too and only the
+        armature is set up, before that the groups are created (in the same order) on `obj`.
+    """
+    if vertices.indices is None or vertices.weights is None:
+        return
+
+    if assign_weights or bpy.app.version < (3, 0, 0):
+        vertex_groups = {}
+        for bone, weight, bone_vertices in group_skin_weights(vertices.indices, vertices.weights, skeleton.ids):
+            if bone not in vertex_groups:
+                name = skeleton.names[bone]
+                vertex_group = obj.vertex_groups.get(name)
+                vertex_groups[bone] = vertex_group if vertex_group is not None else obj.vertex_groups.new(name=name)
+            if assign_weights:
+                vertex_groups[bone].add(bone_vertices.tolist(), weight, 'REPLACE')
+
+    obj.parent = armature_obj
+    modifier = obj.modifiers.new(name="Armature", type='ARMATURE')
+    modifier.object = armature_obj
+
+
+def build_mesh(name, vertices, triangles, normals_load=True):
+    """
+        Create mesh datablock from `VertexArray` and (N, 3) triangle array.
+
+        All data is written with `foreach_set`, so no per-vertex or per-loop Python work is done.
+        With `normals_load` decoded normals are set as custom split normals.
+    """
+    loop_vertices = np.ascontiguousarray(triangles, dtype=np.int32).ravel()
+    face_count = len(triangles)
+
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(vertices))
+    mesh.vertices.foreach_set('co', vertices.get_buffer('position', np.float32, 3))
+    mesh.loops.add(len(loop_vertices))
+    mesh.loops.foreach_set('vertex_index', loop_vertices)
+    mesh.polygons.add(face_count)
+    mesh.polygons.foreach_set('loop_start', np.arange(0, 3 * face_count, 3, dtype=np.int32))
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set('loop_total', np.full(face_count, 3, dtype=np.int32))
+
+    if vertices.texcoord0 is not None:
+        set_loop_uvs(mesh, vertices.texcoord0, loop_vertices)
+    if vertices.texcoord1 is not None:
+        set_loop_uvs(mesh, vertices.texcoord1, loop_vertices, 'texcoord1')
+    if vertices.color is not None:
+        set_loop_colors(mesh, vertices.get_colors(), loop_vertices)
+
+    mesh.update(calc_edges=True)
+
+    normals = vertices.get_normals() if normals_load else None
+    if normals is not None and face_count > 0:
+        set_normals(mesh, normals)
+    return mesh
+
+
+def set_normals(mesh, normals):
+    """
+        Set (N, 3) per-vertex unit normals as custom split normals of smooth shaded mesh.
+    """
+    mesh.polygons.foreach_set('use_smooth', np.ones(len(mesh.polygons), dtype=bool))
+    if bpy.app.version < (4, 1, 0):
+        mesh.use_auto_smooth = True
+    mesh.normals_split_custom_set_from_vertices(normals)
+
+
+def set_loop_uvs(mesh, texcoords, loop_vertices, name=None):
+    """
+        Expand per-vertex texture coordinates to loops and write them to a new UV layer.
+    """
+    uv_layer = mesh.uv_layers.new() if name is None else mesh.uv_layers.new(name=name)
+    loop_uvs = np.ascontiguousarray(texcoords[loop_vertices, :2], dtype=np.float32)
+    uv_layer.data.foreach_set('uv', loop_uvs.ravel())
+    return uv_layer
+
+
+def set_loop_colors(mesh, colors, loop_vertices, name='Col'):
+    """
+        Expand per-vertex RGBA colors to loops and write them to a new color attribute.
+    """
+    loop_colors = np.ascontiguousarray(colors[loop_vertices], dtype=np.float32).ravel()
+    if bpy.app.version >= (3, 4, 0):
+        color_attribute = mesh.color_attributes.new(name, 'BYTE_COLOR', 'CORNER')
+        color_attribute.data.foreach_set('color_srgb', loop_colors)
+    else:
+        color_attribute = mesh.vertex_colors.new(name=name)
+        color_attribute.data.foreach_set('color', loop_colors)
+    return color_attribute
+
+
+_registry = {}
+
+def _get_registered(collection, key):
+    """
+        Find datablock built earlier for `key`.
+
+        Only names are remembered (datablock references don't survive undo), and the found datablock
+        must still carry the same key, so renamed or deleted datablocks are rebuilt. Datablocks from
+        earlier sessions (saved in the .blend file) are found by their key.
+    """
+    datablock = collection.get(_registry.get((collection.rna_type.identifier, key), ''))
+    if datablock is not None and datablock.get('allods_key') == key:
+        return datablock
+    for datablock in collection:
+        if datablock.get('allods_key') == key:
+            return _register(collection, key, datablock)
+    return None
+
+def _register(collection, key, datablock):
+    datablock['allods_key'] = key
+    _registry[(collection.rna_type.identifier, key)] = datablock.name
+    return datablock
+
+
+def get_material(name, image=None):
+    """
+        Return material with given diffuse texture (file path or `TexturePixels`), building it only once.
+    """
+    key = f'{name}|{image.key if isinstance(image, TexturePixels) else image or ""}'
+    material = _get_registered(bpy.data.materials, key)
+    if material is None:
+        material = _register(bpy.data.materials, key, build_material(name, image))
+    return material
+
+
+def has_image(image):
+    """
+        Whether packed image of `TexturePixels` exists already, so its pixels won't be needed.
+    """
+    return _get_registered(bpy.data.images, f'pixels|{image.key}') is not None
+
+
+def get_image(image):
+    """
+        Image datablock of converted texture file, or packed image filled from `TexturePixels`.
+    """
+    if not isinstance(image, TexturePixels):
+        return bpy.data.images.load(filepath=str(image), check_existing=True)
+
+    key = f'pixels|{image.key}'
+    datablock = _get_registered(bpy.data.images, key)
+    if datablock is None:
+        datablock = bpy.data.images.new(image.name, image.width, image.height, alpha=True)
+        datablock.pixels.foreach_set(image.get_buffer())
+        datablock.pack()
+        datablock = _register(bpy.data.images, key, datablock)
+    return datablock
+
+
+def build_material(name, image=None):
+    material = bpy.data.materials.new(name=name)
+    material.blend_method = 'BLEND'
+    if image is not None:
+        material.use_nodes = True
+        material.node_tree.nodes.clear()
+        material_output = material.node_tree.nodes.new('ShaderNodeOutputMaterial')
+        principled_node = material.node_tree.nodes.new('ShaderNodeBsdfPrincipled')
+        texture_node = material.node_tree.nodes.new('ShaderNodeTexImage')
+        texture_node.image = get_image(image)
+        material.node_tree.links.new(texture_node.outputs['Color'], principled_node.inputs['Base Color'])
+        material.node_tree.links.new(texture_node.outputs['Alpha'], principled_node.inputs['Alpha'])
+        material.node_tree.links.new(principled_node.outputs[0], material_output.inputs[0])
+    return material
@@ -0,0 +1,5 @@
+"""
+    Decoding of Allods Online resources (XDB descriptors, BIN blobs, vertices, skeletons, textures).
+
+    Depends only on the standard library and NumPy, so it works outside of Blender.
+"""
@@ -0,0 +1,152 @@
+from struct import error, pack, unpack
+import zlib
+import io
+
+from . import profiling
+
+CHUNK_SIZE = 1 << 20
+
+class Blob:
+
+    def __init__(self, localId, size):
+        self.localId = localId
+        self.size = size
+
+class BinParser:
+    """
+        Reader for `.bin` blob containers.
+
+        By default the whole file is decompressed and every blob is kept. When `blobs` is given the
+        parser works lazily: nothing is read until the first `get_buffer` call, then the file is
+        inflated incrementally, only the requested blobs are kept (as `memoryview`s, without extra
+        copies) and decompression stops right after the highest requested localId.
+    """
+
+    def __init__(self, path, blobs=None):
+        self.path = path
+        self._blobs = []
+        self._index = {}
+        self._requested = None
+        if blobs is None:
+            with profiling.span('blob.inflate'):
+                self._read_blobs()
+        else:
+            self._requested = {blob.localId for blob in blobs}
+
+    def _read_blobs(self):
+        content = io.BytesIO(zlib.decompress(open(self.path, 'rb').read()))
+        while True:
+            try:
+                localId, size = unpack('II',content.read(8))
+                assert localId == len(self._blobs)
+                self._index[localId] = (content.tell(), size)
+                value = content.read(size)
+                self._blobs.append(value)
+            except error:
+                break
+        profiling.count('bytes decompressed', content.tell())
+        content.close()
+
+    def _read_requested_blobs(self):
+        buffers = {}
+        last_id = max(self._requested, default=-1)
+        with open(self.path, 'rb') as file:
+            stream = _InflateStream(file)
+            header = bytearray(8)
+            while len(self._index) <= last_id:
+                if stream.readinto(header) < len(header):
+                    break
+                localId, size = unpack('II', header)
+                assert localId == len(self._index)
+                self._index[localId] = (stream.position, size)
+                if localId in self._requested:
+                    buffer = bytearray(size)
+                    assert stream.readinto(buffer) == size
+                    buffers[localId] = memoryview(buffer)
+                else:
+                    assert stream.skip(size) == size
+        self._blobs = [buffers.get(localId) for localId in range(len(self._index))]
+        profiling.count('bytes decompressed', stream.position)
+
+    def get_index(self):
+        """
+            Map of localId -> (offset in decompressed stream, size) for every blob read so far.
+        """
+        return self._index
+
+    def get_buffer(self, blob):
+        if self._requested is not None:
+            assert blob.localId in self._requested, f'Blob {blob.localId} was not requested'
+            if len(self._index) == 0:
+                with profiling.span('blob.inflate'):
+                    self._read_requested_blobs()
+        assert(len(self._blobs[blob.localId]) == blob.size)
+        return self._blobs[blob.localId]
+
+def write_blobs(path, blobs, level=6):
+    """
+        Write `.bin` blob container readable by `BinParser`, i-th blob gets localId `i`.
+
+        Every blob is a sequence of buffers (bytes-like objects or NumPy arrays), which are compressed
+        in `CHUNK_SIZE` pieces as they are written. Neither whole blobs nor the compressed file are
+        ever joined in memory.
+    """
+    compressor = zlib.compressobj(level)
+    with open(path, 'wb') as writer:
+        for localId, chunks in enumerate(blobs):
+            chunks = [_as_bytes(chunk) for chunk in chunks]
+            writer.write(compressor.compress(pack('II', localId, sum(len(chunk) for chunk in chunks))))
+            for chunk in chunks:
+                for start in range(0, len(chunk), CHUNK_SIZE):
+                    writer.write(compressor.compress(chunk[start:start + CHUNK_SIZE]))
+        writer.write(compressor.flush())
+
+def _as_bytes(buffer):
+    if hasattr(buffer, 'dtype'):
+        # NumPy array, viewed as raw bytes without copying when it's already contiguous
+        buffer = buffer.reshape(-1)
+        if not buffer.flags['C_CONTIGUOUS']:
+            buffer = buffer.copy()
+        buffer = buffer.view('u1')
+    return memoryview(buffer).cast('B')
+
+class _InflateStream:
+    """
+        Incremental zlib reader over a file object, inflating at most `CHUNK_SIZE` bytes at a time.
+    """
+
+    def __init__(self, file):
+        self._file = file
+        self._decompressor = zlib.decompressobj()
+        self._pending = memoryview(b'')
+        self.position = 0
+
+    def readinto(self, buffer):
+        return self._consume(len(buffer), memoryview(buffer))
+
+    def skip(self, size):
+        return self._consume(size, None)
+
+    def _consume(self, size, target):
+        done = 0
+        while done < size:
+            if len(self._pending) == 0 and not self._inflate():
+                break
+            count = min(size - done, len(self._pending))
+            if target is not None:
+                target[done:done + count] = self._pending[:count]
+            self._pending = self._pending[count:]
+            done += count
+        self.position += done
+        return done
+
+    def _inflate(self):
+        while not self._decompressor.eof:
+            data = self._decompressor.unconsumed_tail or self._file.read(CHUNK_SIZE)
+            if not data:
+                break
+            chunk = self._decompressor.decompress(data, CHUNK_SIZE)
+            if chunk:
+                self._pending = memoryview(chunk)
+                return True
+        return False
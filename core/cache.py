@@ -0,0 +1,164 @@
+import hashlib
+import os
+from concurrent import futures
+from pathlib import Path
+
+from . import texture
+from . import xdb
+from . import workers
+from . import profiling
+
+HASH_CHUNK_SIZE = 1 << 20
+
+class TextureCache:
+    """
+        Persistent cache of converted `.dds` textures.
+
+        Entries are keyed by the content hash of the source `.bin` and the conversion parameters, so they
+        survive moved assets and are rebuilt when the source changes. Once the total size exceeds
+        `max_size` bytes, least recently used entries are removed.
+    """
+
+    def __init__(self, directory, max_size=1 << 30):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+    def get_key(self, source_path, width, height, type):
+        digest = hashlib.sha1(f'{width}x{height}:{type}:'.encode('utf-8'))
+        with open(source_path, 'rb') as reader:
+            for chunk in iter(lambda: reader.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_path(self, key):
+        return self.directory / f'{key}.dds'
+
+    def fetch(self, source_path, width=512, height=512, type="DXT5"):
+        """
+            Return path of converted texture, converting it on cache miss.
+        """
+        path = self.get_path(self.get_key(source_path, width, height, type))
+        if path.exists():
+            os.utime(path)
+            profiling.count('textures cached')
+            return path
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        texture.TextureData(source_path, width, height, type).save_to(temp_path)
+        os.replace(temp_path, path)
+        profiling.count('textures converted')
+        self.evict(keep=path)
+        return path
+
+    def fetch_pixels(self, source_path, width=512, height=512, type="DXT5", lazy=False):
+        """
+            Decode texture to `TexturePixels` in memory, nothing is written to the cache directory.
+            With `lazy` only its key is computed, it's decoded on first use of its pixels.
+
+            Textures `decode_dxt` can't decode are converted to a file by `fetch` instead.
+        """
+        if type not in texture.BLOCK_SIZES:
+            return self.fetch(source_path, width, height, type)
+        key = self.get_key(source_path, width, height, type)
+        if lazy:
+            return texture.TexturePixels(Path(source_path).stem, key, source=(source_path, width, height, type))
+        pixels = texture.TextureData(source_path, width, height, type).get_pixels()
+        profiling.count('textures decoded')
+        return texture.TexturePixels(Path(source_path).stem, key, pixels)
+
+    def evict(self, keep=None):
+        entries = []
+        for path in self.directory.glob('*.dds'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+def fetch_resource(texture_cache, resource, basedir, xdb_cache=None, resource_index=None, in_memory=False,
+                   lazy=False):
+    """
+        Resolve texture resource (`.xdb` href) and return path of its converted texture, or its
+        `TexturePixels` decoded in memory with `in_memory` (on first use with `lazy`).
+
+        With `resource_index` indexed textures are resolved without reading their descriptor.
+        Module level function, so it can be used as process pool job.
+    """
+    indexed = resource_index.get_texture_info(resource) if resource_index is not None else None
+    if indexed is not None:
+        binary_file, texture_info = indexed
+        basedir = resource_index.root
+    else:
+        texture_parser = xdb.XdbParser(Path(basedir) / resource, xdb_cache)
+        binary_file, texture_info = texture_parser.get_binary_file(), texture_parser.get_texture_info()
+    source_path = (Path(basedir) / binary_file).with_suffix('.bin')
+    if in_memory:
+        return texture_cache.fetch_pixels(source_path, *texture_info, lazy=lazy)
+    return texture_cache.fetch(source_path, *texture_info)
+
+class TextureConverter:
+    """
+        Converts texture resources in the shared worker pool while the caller keeps working.
+
+        With `max_workers=0` textures are converted on demand in the calling process. With `in_memory`
+        textures are decoded to `TexturePixels` instead of being converted to files.
+    """
+
+    def __init__(self, texture_cache, basedir, max_workers=None, xdb_cache=None, resource_index=None,
+                 in_memory=False):
+        self.texture_cache = texture_cache
+        self.basedir = basedir
+        self.xdb_cache = xdb_cache
+        self.resource_index = resource_index
+        self.max_workers = max_workers
+        self.in_memory = in_memory
+        self._jobs = {}
+
+    def submit(self, resources):
+        for resource in resources:
+            if resource in self._jobs:
+                continue
+            if self.max_workers == 0:
+                self._jobs[resource] = None
+            else:
+                self._jobs[resource] = workers.submit(fetch_resource, self.texture_cache, resource, self.basedir,
+                                                      self.xdb_cache, self.resource_index, self.in_memory,
+                                                      max_workers=self.max_workers)
+
+    def get_texture(self, resource):
+        job = self._jobs.get(resource)
+        if isinstance(job, futures.Future):
+            with profiling.span('texture.wait'):
+                return job.result()
+        if job is None:
+            job = self._jobs[resource] = fetch_resource(self.texture_cache, resource, self.basedir, self.xdb_cache,
+                                                        self.resource_index, self.in_memory)
+        return job
+
+    def done(self):
+        return all(job.done() for job in self._jobs.values() if isinstance(job, futures.Future))
+
+    def close(self):
+        for job in self._jobs.values():
+            if isinstance(job, futures.Future):
+                job.cancel()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,186 @@
+import hashlib
+import zlib
+from enum import Enum
+
+import numpy as np
+
+class ModelElement:
+
+    def __init__(self, lods, name, material_name, vertex_declaration_id, vertex_buffer_offset, material, skin_index, virtual_offset):
+        self.lods = lods
+        self.name = name
+        self.material_name = material_name
+        self.vertex_declaration_id = vertex_declaration_id
+        self.vertex_buffer_offset = vertex_buffer_offset
+        self.material = material
+        self.skin_index = skin_index
+        self.virtual_offset = virtual_offset
+
+class GeometryFragment:
+
+    def __init__(self, vertex_buffer_begin, vertex_buffer_end, index_buffer_begin, index_buffer_end):
+        self.vertex_buffer_begin = vertex_buffer_begin
+        self.vertex_buffer_end = vertex_buffer_end
+        self.index_buffer_begin = index_buffer_begin
+        self.index_buffer_end = index_buffer_end
+
+class Material:
+
+    def __init__(self, blend_effect, diffuse_texture, scroll_alpha, scroll_rgb, transparency_texture, transparent, use_fog, u_translate_speed, visible, v_translate_speed):
+        self.blend_effect = blend_effect
+        self.diffuse_texture = diffuse_texture
+        self.scroll_alpha = scroll_alpha
+        self.scroll_rgb = scroll_rgb
+        self.transparency_texture = transparency_texture
+        self.transparent = transparent
+        self.use_fog = use_fog
+        self.u_translate_speed = u_translate_speed
+        self.visible = visible
+        self.v_translate_speed = v_translate_speed
+
+class BlendEffect(Enum):
+
+    BLEND_EFFECT_ADD =0 
+    BLEND_EFFECT_ALPHA = 1
+    BLEND_EFFECT_ALPHA_ADD = 2
+    BLEND_EFFECT_COLOR = 3
+    BLEND_EFFECT_COLOR_ADD = 4
+
+
+def decode_indices(buffer, vertex_count, index_count=None):
+    """
+        Decode index buffer into (N, 3) array of triangles without copying it.
+
+        Index width is taken from the buffer size when it holds exactly `index_count` (number of indices
+        referenced by fragments, if known) 16-bit or 32-bit indices. Only otherwise it's 32 bits when
+        `vertex_count` doesn't fit into 16 bits, because elements with their own `vertexBufferOffset` keep
+        16-bit indices over larger buffers. Indices outside of `vertex_count` vertices raise `ValueError`.
+    """
+    if index_count and len(buffer) == 2 * index_count:
+        dtype = np.dtype('<u2')
+    elif index_count and len(buffer) == 4 * index_count:
+        dtype = np.dtype('<u4')
+    else:
+        dtype = np.dtype('<u4' if vertex_count > 1 << 16 else '<u2')
+    count = len(buffer) // dtype.itemsize // 3 * 3
+    triangles = np.frombuffer(buffer, dtype=dtype, count=count).reshape(-1, 3)
+    if count > 0 and int(triangles.max()) >= vertex_count:
+        raise ValueError(f'Index buffer references vertex {int(triangles.max())} of {vertex_count}')
+    return triangles
+
+
+def get_lod_indices(triangles, fragment):
+    """
+        Flat indices of a fragment, `index_buffer_begin/end` count indices, not triangles.
+    """
+    return triangles[fragment.index_buffer_begin // 3:fragment.index_buffer_end // 3].ravel()
+
+
+def extract_lod(vertices, triangles, fragment, first_vertex=0):
+    """
+        Cut one LOD out of the shared vertex/index buffers.
+
+        `vertices` is a `VertexArray` (see `VertexBinConverter.bin_to_arrays`) starting with vertex
+        `first_vertex`, `triangles` the whole index buffer (see `decode_indices`). Returns the compacted
+        vertex arrays (ordered by original vertex index) and the remapped triangles as (N, 3) array.
+        Runs in time linear to the LOD size.
+    """
+    lod_indices = get_lod_indices(triangles, fragment)
+    if len(lod_indices) == 0:
+        return vertices[:0], \
+               np.zeros((0, 3), dtype=np.uint32)
+
+    low, high = int(lod_indices.min()), int(lod_indices.max())
+    if low < first_vertex or high - first_vertex >= len(vertices):
+        raise ValueError(f'LOD references vertices {low}-{high} outside of decoded range')
+    used = np.zeros(high - low + 1, dtype=bool)
+    used[lod_indices - low] = True
+    remap = np.cumsum(used, dtype=np.uint32) - 1
+    lod_vertex_ids = np.flatnonzero(used) + (low - first_vertex)
+
+    return vertices[lod_vertex_ids], remap[lod_indices - low].reshape(-1, 3)
+
+
+def get_geometry_key(vertices, triangles):
+    """
+        Content hash of compacted LOD geometry, equal for LODs that would build identical meshes.
+    """
+    digest = hashlib.sha1()
+    for name, array in vertices.items():
+        if array is not None:
+            digest.update(f'{name}:{array.dtype.str}:{array.shape}'.encode('utf-8'))
+            digest.update(np.ascontiguousarray(array).data)
+    digest.update(f'triangles:{triangles.dtype.str}:{triangles.shape}'.encode('utf-8'))
+    digest.update(np.ascontiguousarray(triangles).data)
+    return digest.hexdigest()
+
+
+def get_vertex_range(triangles, fragments):
+    """
+        Range of vertices `[begin, end)` referenced by `fragments`.
+
+        Declared fragment ranges are widened by the indices actually used, so damaged ranges
+        in descriptors don't cut vertices off.
+    """
+    begin, end = None, None
+    for fragment in fragments:
+        lod_indices = get_lod_indices(triangles, fragment)
+        ranges = [(fragment.vertex_buffer_begin, fragment.vertex_buffer_end)]
+        if len(lod_indices) > 0:
+            ranges.append((int(lod_indices.min()), int(lod_indices.max()) + 1))
+        for low, high in ranges:
+            if high > low:
+                begin = low if begin is None else min(begin, low)
+                end = high if end is None else max(end, high)
+    return (0, 0) if begin is None else (begin, end)
+
+
+def group_skin_weights(bone_indices, weights, bone_ids):
+    """
+        Group vertex influences for bulk vertex group assignment.
+
+        `bone_indices` and `weights` are (N, K) per-vertex arrays, vertex bone indices refer to skeleton
+        bone ids (`bone_ids[i]` is id of i-th bone). Influences of the same bone are summed, weights are
+        quantized to the precision of their storage type. Yields `(bone, weight, vertices)` so all vertices
+        sharing bone and weight are assigned with a single `VertexGroup.add` call.
+
+        When there are fewer weights than indices, the weight of the next index is implied (the weights of
+        a vertex sum to 1), indices beyond it have no influence.
+    """
+    bone_indices = np.asarray(bone_indices).reshape(len(bone_indices), -1)
+    weights = np.asarray(weights).reshape(len(weights), -1)
+    if weights.dtype.kind == 'u':
+        levels = np.iinfo(weights.dtype).max
+        values = weights / levels
+    else:
+        levels = 1024
+        values = weights.astype(np.float64)
+    if values.shape[1] < bone_indices.shape[1]:
+        values = np.hstack([values, np.clip(1. - values.sum(axis=1, keepdims=True), 0., 1.)])
+    width = min(values.shape[1], bone_indices.shape[1])
+    bone_indices, values = bone_indices[:, :width], values[:, :width].ravel()
+    if len(bone_ids) == 0 or values.size == 0:
+        return
+
+    lookup = np.full(max(int(np.max(bone_ids)), int(np.max(bone_indices))) + 1, -1, dtype=np.int64)
+    lookup[np.asarray(bone_ids, dtype=np.int64)] = np.arange(len(bone_ids))
+    bones = lookup[bone_indices.ravel()]
+    vertices = np.repeat(np.arange(len(bone_indices)), bone_indices.shape[1])
+    valid = (bones >= 0) & (values > 0)
+    if not valid.any():
+        return
+
+    # Sum repeated influences of one bone on the same vertex
+    pairs, inverse = np.unique(vertices[valid] * len(bone_ids) + bones[valid], return_inverse=True)
+    summed = np.bincount(inverse.ravel(), weights=values[valid], minlength=len(pairs))
+    quantized = np.rint(np.minimum(summed, 1.) * levels).astype(np.int64)
+
+    keys = (pairs % len(bone_ids)) * (levels + 1) + quantized
+    order = np.argsort(keys, kind='stable')
+    keys, pair_vertices = keys[order], (pairs // len(bone_ids))[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+    ends = np.append(starts[1:], len(keys))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        bone, level = divmod(int(keys[start]), levels + 1)
+        if level > 0:
+            yield bone, level / levels, pair_vertices[start:end]
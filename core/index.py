@@ -0,0 +1,159 @@
+import hashlib
+import os
+import sqlite3
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from . import xdb
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    path TEXT PRIMARY KEY COLLATE NOCASE,
+    tag TEXT,
+    binary_file TEXT,
+    width INTEGER,
+    height INTEGER,
+    texture_type TEXT,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE TABLE IF NOT EXISTS dependencies (
+    source TEXT COLLATE NOCASE,
+    target TEXT COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS dependencies_source ON dependencies (source);
+CREATE INDEX IF NOT EXISTS dependencies_target ON dependencies (target);
+"""
+
+def get_index_path(directory, root):
+    """
+        Location of the index of data tree `root` inside cache `directory`.
+    """
+    key = hashlib.sha1(str(Path(root).resolve()).encode('utf-8')).hexdigest()[:16]
+    return Path(directory) / f'index_{key}.sqlite'
+
+class ResourceIndex:
+    """
+        SQLite index of `.xdb` resources of an unpacked game data tree.
+
+        Resources are keyed by their path relative to `root` (as used in hrefs, case insensitive) and store
+        tag, `binaryFile`, texture info and referenced resources. `update` rescans only changed files.
+    """
+
+    def __init__(self, path, root):
+        self.path = Path(path)
+        self.root = Path(root)
+        self._connection = None
+
+    def __getstate__(self):
+        # Connections can't be pickled, workers open their own
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        return state
+
+    def exists(self):
+        return self.path.exists()
+
+    def get_connection(self):
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.path))
+            self._connection.row_factory = sqlite3.Row
+            self._connection.executescript(SCHEMA)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def update(self):
+        """
+            Scan data tree, (re)indexing new and modified files and dropping removed ones.
+
+            Returns number of indexed and removed resources.
+        """
+        connection = self.get_connection()
+        known = {row['path']: (row['size'], row['mtime_ns'])
+                 for row in connection.execute('SELECT path, size, mtime_ns FROM resources')}
+        indexed, seen = 0, set()
+        with connection:
+            for directory, _, files in os.walk(self.root):
+                for name in files:
+                    if not name.lower().endswith('.xdb'):
+                        continue
+                    path = Path(directory) / name
+                    resource = path.relative_to(self.root).as_posix()
+                    stat = path.stat()
+                    seen.add(resource)
+                    if known.get(resource) == (stat.st_size, stat.st_mtime_ns):
+                        continue
+                    self._index_resource(connection, resource, path, stat)
+                    indexed += 1
+
+            removed = [(resource,) for resource in known.keys() - seen]
+            connection.executemany('DELETE FROM resources WHERE path = ?', removed)
+            connection.executemany('DELETE FROM dependencies WHERE source = ?', removed)
+        return indexed, len(removed)
+
+    def _index_resource(self, connection, resource, path, stat):
+        # Malformed descriptors are indexed untyped, so one bad file doesn't roll back the whole update
+        try:
+            tag, binary_file, texture, dependencies = self._read_resource(path)
+        except (ET.ParseError, ValueError, TypeError, KeyError):
+            tag, binary_file, texture, dependencies = None, None, (None, None, None), set()
+
+        connection.execute('INSERT OR REPLACE INTO resources VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                           (resource, tag, binary_file, *texture, stat.st_size, stat.st_mtime_ns))
+        connection.execute('DELETE FROM dependencies WHERE source = ?', (resource,))
+        connection.executemany('INSERT INTO dependencies VALUES (?, ?)',
+                               [(resource, dependency) for dependency in sorted(dependencies)])
+
+    @staticmethod
+    def _read_resource(path):
+        record = xdb.extract_record(path)
+        binary_file = (record['binaryFile'] or '').strip('/') or None
+        texture = record['texture'] or (None, None, None)
+        dependencies = set()
+        for model_element in record['modelElements']:
+            material = model_element['material']
+            for href in (material['diffuse_texture'], material['transparency_texture']):
+                href = (href or '').split('#')[0].strip('/')
+                if len(href) > 0:
+                    dependencies.add(href)
+        return record['tag'], binary_file, texture, dependencies
+
+    def get_resource(self, resource):
+        row = self.get_connection().execute('SELECT * FROM resources WHERE path = ?',
+                                            (resource.strip('/'),)).fetchone()
+        return None if row is None else dict(row)
+
+    def get_texture_info(self, resource):
+        """
+            `(binary file, (width, height, type))` of texture resource or `None` when it isn't indexed as texture.
+        """
+        row = self.get_resource(resource)
+        if row is None or row['binary_file'] is None or row['width'] is None:
+            return None
+        return row['binary_file'], (row['width'], row['height'], row['texture_type'])
+
+    def get_dependencies(self, resource):
+        return [row['target'] for row in self.get_connection().execute(
+            'SELECT target FROM dependencies WHERE source = ? ORDER BY target', (resource.strip('/'),))]
+
+    def find_users(self, resources):
+        """
+            Map each of given resources to sorted list of resources referencing it.
+        """
+        users = {resource: [] for resource in resources}
+        keys = {resource.strip('/').lower(): resource for resource in resources}
+        connection = self.get_connection()
+        connection.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (path TEXT COLLATE NOCASE)')
+        with connection:
+            connection.execute('DELETE FROM wanted')
+            connection.executemany('INSERT INTO wanted VALUES (?)', [(key,) for key in keys])
+            rows = connection.execute('SELECT target, source FROM dependencies JOIN wanted ON target = wanted.path '
+                                      'ORDER BY source').fetchall()
+        for row in rows:
+            users[keys[row['target'].lower()]].append(row['source'])
+        return users
@@ -0,0 +1,117 @@
+import time
+from pathlib import Path
+
+from . import xdb
+from . import blob
+from . import geometry
+from . import vertex
+from . import skeleton
+from . import cache
+from . import profiling
+
+class NotGeometryError(ValueError):
+    pass
+
+class ModelData:
+    """
+        Decoded model ready to be assembled into Blender datablocks.
+
+        Holds only plain data and NumPy arrays, so it can be produced in worker processes.
+        `lods[i]` maps LOD id to `(vertices, triangles)` of the i-th model element, `textures` maps diffuse
+        texture resources to converted texture files or `TexturePixels`.
+    """
+
+    def __init__(self, path, name, basedir, model_elements, lod_ids, lods, skeleton, textures):
+        self.path = path
+        self.name = name
+        self.basedir = basedir
+        self.model_elements = model_elements
+        self.lod_ids = lod_ids
+        self.lods = lods
+        self.skeleton = skeleton
+        self.textures = textures
+
+    def get_texture_resources(self):
+        return list(dict.fromkeys(model_element.material.diffuse_texture
+                                  for model_element in self.model_elements
+                                  if len(model_element.material.diffuse_texture) > 0))
+
+
+def load_model(path, lod_ids=None, texture_cache=None, parser=None, xdb_cache=None, resource_index=None,
+               textures_in_memory=False, lazy_textures=False):
+    """
+        Decode geometry resource (`.xdb` + `.bin`) without touching Blender.
+
+        Only LODs from `lod_ids` (all when `None`) are extracted. Textures are converted only
+        when `texture_cache` is given (decoded in memory with `textures_in_memory`, on first use with
+        `lazy_textures`), otherwise `textures` is left empty. Descriptors are read through `xdb_cache` and textures resolved
+        through `resource_index` when given.
+    """
+    path = Path(path)
+    if parser is None:
+        parser = xdb.XdbParser(path, xdb_cache)
+    if not parser.is_geometry():
+        raise NotGeometryError(f'{path} is not a geometry resource')
+    basedir = get_base_dir(path.with_suffix('.bin'), parser.get_binary_file())
+
+    model_elements = parser.get_model_elements()
+    lod_count = min((len(model_element.lods) for model_element in model_elements), default=0)
+    lod_ids = [lod_id for lod_id in range(lod_count) if lod_ids is None or lod_id in lod_ids]
+
+    bin_parser = blob.BinParser(path.with_suffix('.bin'),
+                                [parser.get_vertex_buffer(), parser.get_index_buffer(), parser.get_skeleton()])
+    vertex_bin_converters = [vertex.VertexBinConverter(vertex_declaration)
+                             for vertex_declaration in parser.get_vertex_declarations()]
+    vertex_buffer = bin_parser.get_buffer(parser.get_vertex_buffer())
+    vertex_count = max(((len(vertex_buffer) - model_element.vertex_buffer_offset)
+                        // vertex_bin_converters[model_element.vertex_declaration_id].vertex_declaration.stride
+                        for model_element in model_elements), default=0)
+    index_count = max((lod.index_buffer_end for model_element in model_elements for lod in model_element.lods), default=None)
+    triangles = geometry.decode_indices(bin_parser.get_buffer(parser.get_index_buffer()), vertex_count, index_count)
+    lods = [extract_element_lods(vertex_buffer, triangles, vertex_bin_converters[model_element.vertex_declaration_id],
+                                 model_element, lod_ids)
+            for model_element in model_elements]
+    bone_skeleton = skeleton.BoneBinParser(bin_parser.get_buffer(parser.get_skeleton())).get_skeleton()
+
+    model = ModelData(path, path.name.split('.')[0], basedir, model_elements, lod_ids, lods, bone_skeleton, {})
+    if texture_cache is not None:
+        for resource in model.get_texture_resources():
+            model.textures[resource] = cache.fetch_resource(texture_cache, resource, basedir, xdb_cache,
+                                                            resource_index, textures_in_memory, lazy_textures)
+    return model
+
+
+def extract_element_lods(vertex_buffer, triangles, vertex_bin_converter, model_element, lod_ids):
+    """
+        Decode LODs `lod_ids` of one model element.
+
+        Vertices are decoded with the element's own declaration, starting at its `vertex_buffer_offset`,
+        and only over the range the selected LODs reference.
+    """
+    fragments = [model_element.lods[lod_id] for lod_id in lod_ids]
+    begin, end = geometry.get_vertex_range(triangles, fragments)
+    vertices = vertex_bin_converter.bin_to_arrays(vertex_buffer, model_element.vertex_buffer_offset, begin, end)
+    with profiling.span('lod.extract'):
+        lods = {lod_id: geometry.extract_lod(vertices, triangles, fragment, begin)
+                for lod_id, fragment in zip(lod_ids, fragments)}
+    profiling.count('triangles', sum(len(triangles) for _, triangles in lods.values()))
+    return lods
+
+
+def load_model_job(path, lod_ids=None, texture_cache=None, xdb_cache=None, resource_index=None,
+                   textures_in_memory=False, lazy_textures=False):
+    """
+        Process pool job: `load_model` together with its duration in seconds.
+    """
+    start = time.perf_counter()
+    model = load_model(path, lod_ids, texture_cache, xdb_cache=xdb_cache, resource_index=resource_index,
+                       textures_in_memory=textures_in_memory, lazy_textures=lazy_textures)
+    return model, time.perf_counter() - start
+
+
+def get_base_dir(filepath, relative_part):
+    relative_part = Path(relative_part)
+    return Path(filepath).joinpath(*['..' for _ in range(len(relative_part.parts))]).resolve()
+
+def get_resource_path(resource_path, basedir):
+    return Path(basedir) / Path(resource_path)
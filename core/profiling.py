@@ -0,0 +1,104 @@
+import json
+import os
+import threading
+import time
+
+_profile = None
+_lock = threading.Lock()
+
+class Profile:
+    """
+        Timing spans and counters collected between `start` and `stop`.
+
+        Only the calling process is profiled, work done in worker processes shows up as the time
+        spent waiting for it.
+    """
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.spans = []
+        self.counters = {}
+
+    def get_summary(self):
+        """
+            Map of span name -> (number of spans, total seconds), in order of first occurrence.
+        """
+        summary = {}
+        for name, _, duration, _ in self.spans:
+            calls, total = summary.get(name, (0, 0.))
+            summary[name] = (calls + 1, total + duration)
+        return summary
+
+    def format_summary(self):
+        lines = [f'{name}: {total:.3f}s' + (f' ({calls}x)' if calls > 1 else '')
+                 for name, (calls, total) in self.get_summary().items()]
+        lines += [f'{name}: {value}' for name, value in self.counters.items()]
+        return lines
+
+    def write_trace(self, path):
+        """
+            Write spans and counters as Chrome trace (`chrome://tracing`, Perfetto) JSON file.
+        """
+        pid = os.getpid()
+        events = [{'name': name, 'ph': 'X', 'pid': pid, 'tid': thread,
+                   'ts': (start - self.start_time) * 1e6, 'dur': duration * 1e6}
+                  for name, start, duration, thread in self.spans]
+        end = max((start + duration - self.start_time for _, start, duration, _ in self.spans), default=0.)
+        events += [{'name': name, 'ph': 'C', 'pid': pid, 'tid': 0, 'ts': end * 1e6, 'args': {name: value}}
+                   for name, value in self.counters.items()]
+        with open(path, 'w', encoding='utf-8') as writer:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, writer)
+
+
+class _Span:
+
+    __slots__ = ('profile', 'name', 'start')
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profile.spans.append((self.name, self.start, time.perf_counter() - self.start, threading.get_ident()))
+
+
+class _NoSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+_NO_SPAN = _NoSpan()
+
+
+def start():
+    global _profile
+    _profile = Profile()
+    return _profile
+
+def stop():
+    global _profile
+    profile, _profile = _profile, None
+    return profile
+
+def is_enabled():
+    return _profile is not None
+
+def span(name):
+    """
+        Context manager timing the enclosed block. Does nothing unless profiling was started.
+    """
+    profile = _profile
+    return _NO_SPAN if profile is None else _Span(profile, name)
+
+def count(name, value=1):
+    profile = _profile
+    if profile is not None:
+        with _lock:
+            profile.counters[name] = profile.counters.get(name, 0) + value
@@ -0,0 +1,111 @@
+from struct import unpack, unpack_from
+
+import hashlib
+
+import numpy as np
+
+from . import profiling
+
+NO_PARENT = 65535
+
+_BONE_DTYPE = np.dtype([('inverted_world_matrix', '<f4', (4, 3)), ('parent', '<u4')])
+
+def to_matrix(coefficients):
+    """
+        Build 4x4 matrix from 3x4 one stored row by row, translation in the last row.
+    """
+    return to_matrices(np.reshape(coefficients, (1, 4, 3)))[0]
+
+def to_matrices(coefficients):
+    """
+        Build stack of 4x4 matrices from (N, 4, 3) array of 3x4 ones, translation in the last row.
+    """
+    matrices = np.zeros((len(coefficients), 4, 4))
+    matrices[:, :, :3] = coefficients
+    matrices[:, 3, 3] = 1.
+    return matrices
+
+class Bone:
+
+    def __init__(self, inverted_world_matrix, parent, id, name, local_matrix):
+        self.inverted_world_matrix = inverted_world_matrix
+        self.parent = parent
+        self.id = id
+        self.name = name
+        self.local_matrix = local_matrix
+
+class Skeleton:
+    """
+        Whole skeleton as arrays, bone `i` is the i-th row of each of them.
+
+        Parent of root bones is `NO_PARENT`.
+    """
+
+    def __init__(self, inverted_world_matrices, local_matrices, parents, ids, names):
+        self.inverted_world_matrices = inverted_world_matrices
+        self.local_matrices = local_matrices
+        self.parents = parents
+        self.ids = ids
+        self.names = names
+
+    def __len__(self):
+        return len(self.names)
+
+    def get_key(self):
+        """
+            Content hash of the skeleton.
+        """
+        digest = hashlib.sha1()
+        for array in (self.inverted_world_matrices, self.local_matrices, self.parents, self.ids):
+            digest.update(np.ascontiguousarray(array).data)
+        digest.update('\x00'.join(self.names).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get_world_matrices(self):
+        return np.linalg.inv(self.inverted_world_matrices) if len(self) > 0 else np.zeros((0, 4, 4))
+
+class BoneBinParser:
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.bones = None
+        self.skeleton = None
+
+    def get_skeleton(self):
+        if self.skeleton == None:
+            with profiling.span('skeleton.decode'):
+                self.skeleton = self._read_skeleton()
+            profiling.count('bones decoded', len(self.skeleton))
+        return self.skeleton
+
+    def _read_skeleton(self):
+        bone_list_offset, bone_list_size, bone_names_offset, bone_names_size, bone_ids_offset, bone_ids_size, bone_local_offset, bone_local_size = unpack_from('IIIIIIII', self.buffer)
+
+        assert bone_list_size == bone_names_size == bone_ids_size == bone_local_size
+        count = bone_list_size
+
+        bone_names_offset += 8
+        bone_ids_offset += 16
+        bone_local_offset += 24
+
+        bones = np.frombuffer(self.buffer, dtype=_BONE_DTYPE, count=count, offset=bone_list_offset)
+        local = np.frombuffer(self.buffer, dtype='<f4', count=count * 12, offset=bone_local_offset)
+        ids = np.frombuffer(self.buffer, dtype='<u2', count=count, offset=bone_ids_offset)
+        # Name offsets are relative to their own table entry
+        name_table = np.frombuffer(self.buffer, dtype='<u4', count=count * 2, offset=bone_names_offset).reshape(count, 2)
+        name_starts = (name_table[:, 0] + np.arange(count) * 8 + bone_names_offset).tolist()
+        names = [bytes(self.buffer[start:start + length]).decode('utf-8').rstrip('\x00')
+                 for start, length in zip(name_starts, name_table[:, 1].tolist())]
+
+        return Skeleton(to_matrices(bones['inverted_world_matrix']),
+                        to_matrices(local.reshape(count, 4, 3)),
+                        bones['parent'].astype(np.int64), ids.copy(), names)
+
+    def get_bones(self):
+        if self.bones == None:
+            skeleton = self.get_skeleton()
+            self.bones = [Bone(inverted_world_matrix, parent, id, name, local_matrix)
+                          for inverted_world_matrix, parent, id, name, local_matrix
+                          in zip(skeleton.inverted_world_matrices, skeleton.parents.tolist(), skeleton.ids.tolist(),
+                                 skeleton.names, skeleton.local_matrices)]
+        return self.bones
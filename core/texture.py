@@ -0,0 +1,230 @@
+import io
+import zlib
+import struct
+
+import numpy as np
+
+from . import profiling
+
+DDS_MAGIC = b'DDS '
+DDS_SIGNATURE = b'Allods Blender Import v0.1'
+
+DDSD_CAPS, DDSD_HEIGHT, DDSD_WIDTH, DDSD_PIXELFORMAT = 0x1, 0x2, 0x4, 0x1000
+DDSD_MIPMAPCOUNT, DDSD_LINEARSIZE = 0x20000, 0x80000
+DDPF_FOURCC = 0x4
+DDSCAPS_COMPLEX, DDSCAPS_TEXTURE, DDSCAPS_MIPMAP = 0x8, 0x1000, 0x400000
+
+BLOCK_SIZES = {'DXT1': 8, 'DXT3': 16, 'DXT5': 16}
+
+
+def read_mip_chain(binary):
+    """
+        Split binary texture into mip levels, largest first.
+
+        Levels are `memoryview` slices of the decompressed payload, nothing is copied.
+        The payload stores levels smallest first, each one prefixed by 8 bytes header.
+    """
+    with profiling.span('texture.inflate'):
+        data = memoryview(zlib.decompress(memoryview(binary)[2:], -15))
+    profiling.count('texture bytes decompressed', len(data))
+    max_level, size = struct.unpack_from('2i', data)
+
+    levels, offset = [], 0
+    for _ in range(max_level + 1):
+        if offset + 8 + size > len(data):
+            raise ValueError('Texture data is truncated')
+        levels.append(data[offset + 8:offset + 8 + size])
+        offset += 8 + size
+        size *= 4
+    levels.reverse()
+    return levels
+
+
+def get_mip_size(width, height, level, type="DXT5"):
+    width, height = max(1, width >> level), max(1, height >> level)
+    return max(1, (width + 3) // 4) * max(1, (height + 3) // 4) * BLOCK_SIZES[type]
+
+
+def write_dds(stream, levels, width=512, height=512, type="DXT5"):
+    """
+        Write DDS file with given mip levels (largest first) to binary stream.
+
+        Levels which size doesn't match DXT layout of the texture are dropped, the first one is always kept.
+    """
+    mips = levels[:1]
+    if type in BLOCK_SIZES:
+        for level in levels[1:]:
+            if len(level) != get_mip_size(width, height, len(mips), type):
+                break
+            mips.append(level)
+
+    flags = DDSD_CAPS | DDSD_HEIGHT | DDSD_WIDTH | DDSD_PIXELFORMAT | DDSD_MIPMAPCOUNT | DDSD_LINEARSIZE
+    caps = DDSCAPS_TEXTURE | (DDSCAPS_COMPLEX | DDSCAPS_MIPMAP if len(mips) > 1 else 0)
+
+    stream.write(struct.pack('<4s7I44s', DDS_MAGIC, 124, flags, height, width, len(mips[0]), 0, len(mips), DDS_SIGNATURE))
+    stream.write(struct.pack('<2I4s5I', 32, DDPF_FOURCC, bytes(type, 'utf-8'), 0, 0, 0, 0, 0))
+    stream.write(struct.pack('<4I4x', caps, 0, 0, 0))
+    for mip in mips:
+        stream.write(mip)
+
+
+def bin2dds(binary, width=512, height=512, type="DXT5"):
+    """
+        Convert binary textures to DDS format with full mip chain.
+    """
+    with io.BytesIO() as stream:
+        write_dds(stream, read_mip_chain(binary), width=width, height=height, type=type)
+        return stream.getvalue()
+
+
+def _unpack_565(colors):
+    """
+        (..., ) RGB565 values to (..., 3) float RGB in [0, 255].
+    """
+    colors = colors.astype(np.uint32)
+    rgb = np.stack([(colors >> 11) & 0x1f, (colors >> 5) & 0x3f, colors & 0x1f], axis=-1).astype(np.float32)
+    return rgb * (np.float32(255.) / np.array([31, 63, 31], dtype=np.float32))
+
+def _decode_color_blocks(blocks, three_color_mode):
+    """
+        DXT color blocks (N, 8) to (N, 16, 4) 8-bit RGBA, texels in row order.
+
+        With `three_color_mode` (DXT1) blocks with `color0 <= color1` use the 3 colors + transparent palette.
+    """
+    endpoints = blocks[:, :4].copy().view('<u2')
+    c0, c1 = _unpack_565(endpoints[:, 0]), _unpack_565(endpoints[:, 1])
+    palette = np.empty((len(blocks), 4, 4), dtype=np.float32)
+    palette[:, 0, :3], palette[:, 1, :3] = c0, c1
+    palette[:, 2, :3] = (2 * c0 + c1) / 3
+    palette[:, 3, :3] = (c0 + 2 * c1) / 3
+    palette[:, :, 3] = 255.
+    if three_color_mode:
+        three = endpoints[:, 0] <= endpoints[:, 1]
+        palette[three, 2, :3] = (c0[three] + c1[three]) / 2
+        palette[three, 3] = 0.
+
+    # Palettes are rounded before lookup, so only 8-bit texels are ever expanded
+    palette = np.rint(palette).astype(np.uint8)
+    selectors = blocks[:, 4:8].copy().view('<u4')[:, 0]
+    selectors = (selectors[:, None] >> (2 * np.arange(16, dtype=np.uint32))) & 3
+    return np.take_along_axis(palette, selectors[:, :, None].astype(np.intp), axis=1)
+
+def _decode_explicit_alpha(blocks):
+    """
+        DXT3 alpha blocks (N, 8) to (N, 16) 8-bit alpha.
+    """
+    nibbles = np.stack([blocks & 0xf, blocks >> 4], axis=-1).reshape(len(blocks), 16)
+    return nibbles * np.uint8(17)
+
+def _decode_interpolated_alpha(blocks):
+    """
+        DXT5 alpha blocks (N, 8) to (N, 16) 8-bit alpha.
+    """
+    a0, a1 = blocks[:, 0].astype(np.float32), blocks[:, 1].astype(np.float32)
+    steps = np.arange(1, 7, dtype=np.float32)
+    palette = np.empty((len(blocks), 8), dtype=np.float32)
+    palette[:, 0], palette[:, 1] = a0, a1
+    # 8 alpha mode: 6 interpolated values, otherwise 4 interpolated values, 0 and 255
+    palette[:, 2:] = ((7 - steps) * a0[:, None] + steps * a1[:, None]) / 7
+    six = blocks[:, 0] <= blocks[:, 1]
+    steps = np.arange(1, 5, dtype=np.float32)
+    palette[six, 2:6] = ((5 - steps) * a0[six, None] + steps * a1[six, None]) / 5
+    palette[six, 6], palette[six, 7] = 0., 255.
+
+    bits = np.zeros((len(blocks), 8), dtype=np.uint8)
+    bits[:, :6] = blocks[:, 2:8]
+    bits = bits.view('<u8')[:, 0]
+    selectors = (bits[:, None] >> (3 * np.arange(16, dtype=np.uint64))) & 7
+    return np.take_along_axis(np.rint(palette).astype(np.uint8), selectors.astype(np.intp), axis=1)
+
+def decode_dxt(level, width, height, type="DXT5"):
+    """
+        Decode DXT1/DXT3/DXT5 compressed mip level to (height, width, 4) uint8 RGBA array, top row first.
+
+        All blocks are decoded at once with array operations. Other texture types raise `ValueError`.
+    """
+    if type not in BLOCK_SIZES:
+        raise ValueError(f'Texture type {type} can\'t be decoded, only {", ".join(BLOCK_SIZES)} are supported')
+    blocks_x, blocks_y = max(1, (width + 3) // 4), max(1, (height + 3) // 4)
+    blocks = np.frombuffer(level, dtype=np.uint8, count=blocks_x * blocks_y * BLOCK_SIZES[type])
+    blocks = blocks.reshape(blocks_x * blocks_y, BLOCK_SIZES[type])
+
+    if type == 'DXT1':
+        texels = _decode_color_blocks(blocks, True)
+    else:
+        texels = _decode_color_blocks(blocks[:, 8:], False)
+        texels[:, :, 3] = _decode_explicit_alpha(blocks[:, :8]) if type == 'DXT3' else _decode_interpolated_alpha(blocks[:, :8])
+
+    pixels = texels.reshape(blocks_y, blocks_x, 4, 4, 4)
+    pixels = pixels.transpose(0, 2, 1, 3, 4).reshape(blocks_y * 4, blocks_x * 4, 4)
+    return np.ascontiguousarray(pixels[:height, :width])
+
+
+class TexturePixels:
+    """
+        Decoded texture ready to be copied into an image, `key` identifies its content.
+
+        Without `pixels` the texture is decoded from `source` (`TextureData` arguments) when first needed,
+        so it's cheap to pass between processes and isn't decoded at all when its image already exists.
+    """
+
+    def __init__(self, name, key, pixels=None, source=None):
+        self.name = name
+        self.key = key
+        self.source = source
+        self._pixels = pixels
+
+    @property
+    def pixels(self):
+        if self._pixels is None:
+            self._pixels = TextureData(*self.source).get_pixels()
+            profiling.count('textures decoded')
+        return self._pixels
+
+    @property
+    def width(self):
+        return self.pixels.shape[1]
+
+    @property
+    def height(self):
+        return self.pixels.shape[0]
+
+    def get_buffer(self):
+        """
+            Flat float RGBA in [0, 1], bottom row first, as Blender image pixels are stored.
+        """
+        return (self.pixels[::-1].astype(np.float32) / np.float32(255.)).ravel()
+
+
+def decode_pixels(texture_pixels):
+    """
+        Process pool job: lazy `TexturePixels` with its pixels decoded.
+    """
+    texture_pixels.pixels
+    return texture_pixels
+
+
+class TextureData:
+    def __init__(self, path, width=512, height=512, type="DXT5"):
+        with open(path, 'rb') as reader:
+            self.levels = read_mip_chain(reader.read())
+        self.width = width
+        self.height = height
+        self.type = type
+
+    @property
+    def data(self):
+        with io.BytesIO() as stream:
+            write_dds(stream, self.levels, width=self.width, height=self.height, type=self.type)
+            return stream.getvalue()
+
+    def get_pixels(self):
+        """
+            Largest mip level decoded to RGBA, see `decode_dxt`.
+        """
+        with profiling.span('texture.decode'):
+            return decode_dxt(self.levels[0], self.width, self.height, self.type)
+
+    def save_to(self, path):
+        with profiling.span('texture.write'), open(path, 'wb') as writer:
+            write_dds(writer, self.levels, width=self.width, height=self.height, type=self.type)
@@ -0,0 +1,331 @@
+from enum import Enum
+import itertools
+from struct import pack, unpack
+
+import numpy as np
+
+from . import profiling
+
+class Vertex:
+    
+    def __init__(self, position, normal, color, texcoord0, texcoord1, weights, indices):
+        self.position = position
+        self.normal = normal
+        self.color = color
+        self.texcoord0 = texcoord0
+        self.texcoord1 = texcoord1
+        self.weights = weights
+        self.indices = indices
+
+class VertexDeclaration:
+
+    def __init__(self, position, normal, color, texcoord0, texcoord1, weights, indices, stride):
+        self.position = position
+        self.normal = normal
+        self.color = color
+        self.texcoord0 = texcoord0
+        self.texcoord1 = texcoord1
+        self.weights = weights
+        self.indices = indices
+        self.stride = stride
+
+class VertexComponent:
+
+    def __init__(self, type, offset):
+        self.type = type
+        self.offset = offset
+
+class VertexElementType(Enum):
+    FLOAT1 = 1
+    FLOAT2 = 2
+    FLOAT3 = 3
+    FLOAT4 = 4
+    SHORT2 = 5
+    SHORT4 = 6
+    COLOR4 = 7
+    UBYTE4 = 8
+    USHORT2 = 9
+    USHORT4 = 10
+    HALF4 = 11
+    UNUSED = 12
+
+VERTEX_ATTRIBUTES = ('position', 'normal', 'color', 'texcoord0', 'texcoord1', 'weights', 'indices')
+
+class VertexArray:
+    """
+        Struct-of-arrays vertex container.
+
+        Each attribute is an array with one row per vertex (`None` when the declaration doesn't store it).
+        Indexing with a slice or an index array selects vertices of all attributes at once, indexing with
+        an integer returns a `Vertex` copy of one vertex, meant only for debugging.
+    """
+
+    __slots__ = VERTEX_ATTRIBUTES
+
+    def __init__(self, position=None, normal=None, color=None, texcoord0=None, texcoord1=None, weights=None,
+                 indices=None):
+        self.position = position
+        self.normal = normal
+        self.color = color
+        self.texcoord0 = texcoord0
+        self.texcoord1 = texcoord1
+        self.weights = weights
+        self.indices = indices
+
+    def __len__(self):
+        return next((len(array) for _, array in self.items() if array is not None), 0)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return Vertex(*(None if array is None else array[index].tolist() if array.ndim == 1
+                            else tuple(array[index].tolist()) for _, array in self.items()))
+        return VertexArray(*(None if array is None else array[index] for _, array in self.items()))
+
+    def items(self):
+        return ((name, getattr(self, name)) for name in VERTEX_ATTRIBUTES)
+
+    def get_buffer(self, name, dtype=np.float32, components=None):
+        """
+            Flat contiguous copy of attribute `name` (first `components` of each row), ready for `foreach_set`.
+        """
+        array = getattr(self, name)
+        if components is not None:
+            array = array[:, :components]
+        return np.ascontiguousarray(array, dtype=dtype).ravel()
+
+    def get_normals(self):
+        """
+            Unit normals as (N, 3) float32 array, `None` when the declaration has no normals.
+
+            Packed integer normals are mapped to [-1, 1] first: signed ones (SHORT4) by their maximum,
+            unsigned ones (UBYTE4, USHORT4) from [0, max]. Zero normals are left zero.
+        """
+        if self.normal is None:
+            return None
+        normals = self.normal.reshape(len(self.normal), -1)[:, :3]
+        if normals.dtype.kind == 'i':
+            normals = normals / np.float32(np.iinfo(normals.dtype).max)
+        elif normals.dtype.kind == 'u':
+            normals = normals * np.float32(2. / np.iinfo(normals.dtype).max) - np.float32(1.)
+        normals = normals.astype(np.float32)
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+    def get_colors(self):
+        """
+            RGBA colors in [0, 1] as (N, 4) float32 array, `None` when the declaration has no colors.
+
+            COLOR4 is stored as Direct3D color, in BGRA byte order.
+        """
+        if self.color is None:
+            return None
+        colors = self.color.reshape(len(self.color), -1)
+        if colors.dtype.kind in 'iu':
+            colors = colors[:, [2, 1, 0, 3]] / np.float32(np.iinfo(colors.dtype).max)
+        return np.ascontiguousarray(colors, dtype=np.float32)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for _, array in self.items() if array is not None)
+
+_ELEMENT_DTYPES = {
+    VertexElementType.FLOAT1: ('<f4', ()),
+    VertexElementType.FLOAT2: ('<f4', (2,)),
+    VertexElementType.FLOAT3: ('<f4', (3,)),
+    VertexElementType.FLOAT4: ('<f4', (4,)),
+    VertexElementType.SHORT2: ('<i2', (2,)),
+    VertexElementType.SHORT4: ('<i2', (4,)),
+    VertexElementType.COLOR4: ('u1', (4,)),
+    VertexElementType.UBYTE4: ('u1', (4,)),
+    VertexElementType.USHORT2: ('<u2', (2,)),
+    VertexElementType.USHORT4: ('<u2', (4,)),
+    VertexElementType.HALF4: ('<f2', (4,)),
+}
+
+def encode_normals(normals, dtype):
+    """
+        Inverse of `VertexArray.get_normals`: pack (N, 3) unit normals into `dtype` values.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'i':
+        return np.rint(normals * np.iinfo(dtype).max).astype(dtype)
+    elif dtype.kind == 'u':
+        return np.rint((normals + 1.) * (np.iinfo(dtype).max / 2.)).astype(dtype)
+    return normals.astype(dtype)
+
+def encode_colors(colors, dtype):
+    """
+        Inverse of `VertexArray.get_colors`: pack (N, 4) RGBA colors in [0, 1] into `dtype` values.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind in 'iu':
+        return np.rint(np.clip(colors[:, [2, 1, 0, 3]], 0., 1.) * np.iinfo(dtype).max).astype(dtype)
+    return colors.astype(dtype)
+
+class VertexBinConverter:
+
+    def __init__(self, vertex_declaration):
+        self.vertex_declaration = vertex_declaration
+        self._dtype = None
+
+    def get_dtype(self):
+        """
+            Structured dtype describing one vertex of the declaration.
+
+            UNUSED components are left out, so the dtype only covers fields that are actually stored.
+        """
+        if self._dtype is None:
+            names, formats, offsets = [], [], []
+            for name in VERTEX_ATTRIBUTES:
+                vertex_component = getattr(self.vertex_declaration, name)
+                if vertex_component.type == VertexElementType.UNUSED:
+                    continue
+                if vertex_component.type not in _ELEMENT_DTYPES:
+                    raise Exception('Unknown value type: {}'.format(vertex_component.type))
+                names.append(name)
+                formats.append(_ELEMENT_DTYPES[vertex_component.type])
+                offsets.append(vertex_component.offset)
+            self._dtype = np.dtype({
+                'names': names,
+                'formats': formats,
+                'offsets': offsets,
+                'itemsize': self.vertex_declaration.stride
+            })
+        return self._dtype
+
+    def bin_to_arrays(self, buffer, offset=0, begin=0, end=None):
+        """
+            Decode vertex buffer at once.
+
+            Returns `VertexArray` of contiguous arrays with one row per vertex
+            (`None` for UNUSED components). Only vertices `begin` to `end` of the block starting at byte
+            `offset` are decoded, the buffer itself is viewed in place.
+        """
+        stride = self.vertex_declaration.stride
+        if end is None:
+            assert (len(buffer) - offset) % stride == 0
+            end = (len(buffer) - offset) // stride
+        with profiling.span('vertex.decode'):
+            records = np.frombuffer(buffer, dtype=self.get_dtype(), count=end - begin, offset=offset + begin * stride)
+            arrays = VertexArray()
+            for name in records.dtype.names:
+                setattr(arrays, name, np.ascontiguousarray(records[name]))
+        profiling.count('vertices decoded', len(records))
+        return arrays
+
+    def arrays_to_bin(self, vertex_array):
+        """
+            Encode `VertexArray` into vertex buffer records of the declaration, one pass per attribute.
+
+            Values are cast to component types (rounded and clipped for integer ones), extra columns are
+            dropped, missing columns and attributes are left zero. Returns structured array, its buffer
+            is the encoded vertex stream.
+        """
+        records = np.zeros(len(vertex_array), dtype=self.get_dtype())
+        for name in records.dtype.names:
+            array = getattr(vertex_array, name)
+            if array is None:
+                continue
+            field = records[name].reshape(len(records), -1)
+            array = array.reshape(len(array), -1)
+            width = min(field.shape[1], array.shape[1])
+            if field.dtype.kind in 'iu' and array.dtype.kind == 'f':
+                limits = np.iinfo(field.dtype)
+                array = np.clip(np.rint(array[:, :width]), limits.min, limits.max)
+            field[:, :width] = array[:, :width]
+        return records
+
+    def vertex_to_bin(self, vertex):
+        buffer = [0] * self.vertex_declaration.stride
+        VertexBinConverter._write_vertex_component(self.vertex_declaration.position, buffer, vertex.position)
+        VertexBinConverter._write_vertex_component(self.vertex_declaration.normal, buffer, vertex.normal)
+        VertexBinConverter._write_vertex_component(self.vertex_declaration.color, buffer, vertex.color)
+        VertexBinConverter._write_vertex_component(self.vertex_declaration.texcoord0, buffer, vertex.texcoord0)
+        VertexBinConverter._write_vertex_component(self.vertex_declaration.texcoord1, buffer, vertex.texcoord1)
+        VertexBinConverter._write_vertex_component(self.vertex_declaration.weights, buffer, vertex.weights)
+        VertexBinConverter._write_vertex_component(self.vertex_declaration.indices, buffer, vertex.indices)
+        return buffer
+
+    def bin_to_vertex(self, buffer):
+        assert len(buffer) == self.vertex_declaration.stride
+        return Vertex(
+            VertexBinConverter._read_vertex_component(self.vertex_declaration.position, buffer),
+            VertexBinConverter._read_vertex_component(self.vertex_declaration.normal, buffer),
+            VertexBinConverter._read_vertex_component(self.vertex_declaration.color, buffer),
+            VertexBinConverter._read_vertex_component(self.vertex_declaration.texcoord0, buffer),
+            VertexBinConverter._read_vertex_component(self.vertex_declaration.texcoord1, buffer),
+            VertexBinConverter._read_vertex_component(self.vertex_declaration.weights, buffer),
+            VertexBinConverter._read_vertex_component(self.vertex_declaration.indices, buffer)
+        )
+    
+    def bin_to_vertices(self, buffer):
+        arrays = self.bin_to_arrays(buffer)
+        count = len(buffer) // self.vertex_declaration.stride
+        columns = []
+        for _, array in arrays.items():
+            if array is None:
+                columns.append(itertools.repeat(None, count))
+            elif array.ndim == 1:
+                columns.append(array.tolist())
+            else:
+                columns.append(map(tuple, array.tolist()))
+        return [Vertex(*values) for values in zip(*columns)]
+        
+
+    @staticmethod
+    def _read_vertex_component(vertex_component, buffer):
+        if vertex_component.type == VertexElementType.FLOAT1:
+            return unpack('f', buffer[vertex_component.offset:vertex_component.offset+4])[0]
+        elif vertex_component.type == VertexElementType.FLOAT2:
+            return unpack('ff', buffer[vertex_component.offset:vertex_component.offset+8])
+        elif vertex_component.type == VertexElementType.FLOAT3:
+            return unpack('fff', buffer[vertex_component.offset:vertex_component.offset+12])
+        elif vertex_component.type == VertexElementType.FLOAT4:
+            return unpack('ffff', buffer[vertex_component.offset:vertex_component.offset+16])
+        elif vertex_component.type == VertexElementType.SHORT2:
+            return unpack('hh', buffer[vertex_component.offset:vertex_component.offset+4])
+        elif vertex_component.type == VertexElementType.SHORT4:
+            return unpack('hhhh', buffer[vertex_component.offset:vertex_component.offset+8])
+        elif vertex_component.type == VertexElementType.COLOR4:
+            return unpack('BBBB', buffer[vertex_component.offset:vertex_component.offset+4])
+        elif vertex_component.type == VertexElementType.UBYTE4:    
+            return unpack('BBBB', buffer[vertex_component.offset:vertex_component.offset+4])
+        elif vertex_component.type == VertexElementType.USHORT2:    
+            return unpack('HH', buffer[vertex_component.offset:vertex_component.offset+4])
+        elif vertex_component.type == VertexElementType.USHORT4:
+            return unpack('HHHH', buffer[vertex_component.offset:vertex_component.offset+8])     
+        elif vertex_component.type == VertexElementType.HALF4:
+            return unpack('eeee', buffer[vertex_component.offset:vertex_component.offset+8])
+        elif vertex_component.type == VertexElementType.UNUSED:
+            return None
+        else:
+            raise Exception('Unknown value type: {}'.format(vertex_component.type))
+
+    @staticmethod
+    def _write_vertex_component(vertex_component, buffer, value):
+        if vertex_component.type == VertexElementType.FLOAT1:
+            buffer[vertex_component.offset:vertex_component.offset+4] = pack('f', value)
+        elif vertex_component.type == VertexElementType.FLOAT2:
+            buffer[vertex_component.offset:vertex_component.offset+8] = pack('ff', *value)
+        elif vertex_component.type == VertexElementType.FLOAT3:
+            buffer[vertex_component.offset:vertex_component.offset+12] = pack('fff', *value)
+        elif vertex_component.type == VertexElementType.FLOAT4:
+            buffer[vertex_component.offset:vertex_component.offset+16] = pack('ffff', *value)
+        elif vertex_component.type == VertexElementType.SHORT2:
+            buffer[vertex_component.offset:vertex_component.offset+4] = pack('hh', *value)
+        elif vertex_component.type == VertexElementType.SHORT4:
+            buffer[vertex_component.offset:vertex_component.offset+8] = pack('hhhh', *value)
+        elif vertex_component.type == VertexElementType.COLOR4:
+            buffer[vertex_component.offset:vertex_component.offset+4] = pack('BBBB', *value)
+        elif vertex_component.type == VertexElementType.UBYTE4:    
+            buffer[vertex_component.offset:vertex_component.offset+4] = pack('BBBB', *value)
+        elif vertex_component.type == VertexElementType.USHORT2:    
+            buffer[vertex_component.offset:vertex_component.offset+4] = pack('HH', *value)
+        elif vertex_component.type == VertexElementType.USHORT4:
+            buffer[vertex_component.offset:vertex_component.offset+8] = pack('HHHH', *value)     
+        elif vertex_component.type == VertexElementType.HALF4:
+            buffer[vertex_component.offset:vertex_component.offset+8] = pack('eeee', *value)
+        elif vertex_component.type == VertexElementType.UNUSED:
+            pass
+        else:
+            raise Exception('Unknown value type: {}'.format(vertex_component.type))
@@ -0,0 +1,52 @@
+import multiprocessing
+import os
+from concurrent import futures
+
+_executor = None
+_max_workers = 0
+_executable = None
+
+def set_executable(executable):
+    """
+        Python interpreter workers are started with, `sys.executable` when not set.
+
+        Inside Blender before 2.91 `sys.executable` is Blender itself, the bundled Python must be set then.
+    """
+    global _executable
+    if executable != _executable:
+        shutdown()
+    _executable = executable
+
+def get_executor(max_workers=None):
+    """
+        Shared process pool.
+
+        It's kept alive between imports, so worker processes (and modules they've imported)
+        are reused instead of being spawned again for each import.
+    """
+    global _executor, _max_workers
+    max_workers = max_workers or os.cpu_count()
+    if _executor is not None and _max_workers != max_workers:
+        shutdown()
+    if _executor is None:
+        # Forking Blender itself is unsafe, workers always start as fresh interpreters
+        context = multiprocessing.get_context('spawn')
+        if _executable is not None:
+            context.set_executable(_executable)
+        _executor = futures.ProcessPoolExecutor(max_workers, mp_context=context)
+        _max_workers = max_workers
+    return _executor
+
+def submit(fn, *args, max_workers=None):
+    try:
+        return get_executor(max_workers).submit(fn, *args)
+    except futures.process.BrokenProcessPool:
+        # A worker died (e.g. was killed), start over with a fresh pool
+        shutdown()
+        return get_executor(max_workers).submit(fn, *args)
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
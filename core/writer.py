@@ -0,0 +1,86 @@
+import struct
+from pathlib import Path
+
+import numpy as np
+
+from . import blob
+from . import geometry
+from . import vertex
+from . import xdb
+
+T = vertex.VertexElementType
+C = vertex.VertexComponent
+
+# Layout of exported vertices, skinning is not exported
+EXPORT_DECLARATION = vertex.VertexDeclaration(position=C(T.FLOAT3, 0), normal=C(T.SHORT4, 12), color=C(T.COLOR4, 20),
+                                              texcoord0=C(T.FLOAT2, 24), texcoord1=C(T.FLOAT2, 32),
+                                              weights=C(T.UNUSED, 0), indices=C(T.UNUSED, 0), stride=40)
+
+# Skeleton blob without bones, offsets in the header are relative to their own field
+EMPTY_SKELETON = struct.pack('8I', 32, 0, 24, 0, 16, 0, 8, 0)
+
+class ExportElement:
+    """
+        Model element to be written, `lods` is a list of `(VertexArray, triangles)` with float attributes:
+        unit normals and RGBA colors in [0, 1].
+    """
+
+    def __init__(self, name, material_name, lods, material=None):
+        self.name = name
+        self.material_name = material_name
+        self.lods = lods
+        self.material = material if material is not None else get_default_material()
+
+
+def get_default_material(diffuse_texture=''):
+    return geometry.Material(geometry.BlendEffect.BLEND_EFFECT_ALPHA, diffuse_texture, False, False, None, False,
+                             True, 0., True, 0.)
+
+
+def encode_vertices(vertices, vertex_bin_converter):
+    """
+        Encode float attributes of `VertexArray` into the declaration's vertex records.
+    """
+    dtype = vertex_bin_converter.get_dtype()
+    encoded = vertex.VertexArray(*(array for _, array in vertices.items()))
+    if vertices.normal is not None and 'normal' in dtype.names:
+        encoded.normal = vertex.encode_normals(vertices.normal, dtype['normal'].base)
+    if vertices.color is not None and 'color' in dtype.names:
+        encoded.color = vertex.encode_colors(vertices.color, dtype['color'].base)
+    return vertex_bin_converter.arrays_to_bin(encoded)
+
+
+def write_model(path, elements, declaration=EXPORT_DECLARATION):
+    """
+        Write geometry resource `path` (`.xdb`) and its `.bin` from `ExportElement`s.
+
+        LODs of all elements share one vertex and one index buffer, each LOD gets its own range of both.
+        Buffers are encoded LOD by LOD and streamed into the compressor, they are never joined.
+    """
+    path = Path(path)
+    vertex_bin_converter = vertex.VertexBinConverter(declaration)
+    # Indices are absolute, `geometry.decode_indices` picks the width back from the buffer size
+    total_vertex_count = sum(len(vertices) for element in elements for vertices, _ in element.lods)
+    index_dtype = np.dtype('<u2' if total_vertex_count <= 1 << 16 else '<u4')
+
+    vertex_chunks, index_chunks, model_elements = [], [], []
+    vertex_count, index_count = 0, 0
+    for element in elements:
+        fragments = []
+        for vertices, triangles in element.lods:
+            vertex_chunks.append(encode_vertices(vertices, vertex_bin_converter))
+            index_chunks.append((np.asarray(triangles, dtype=np.int64).reshape(-1, 3) + vertex_count).astype(index_dtype))
+            fragments.append(geometry.GeometryFragment(vertex_count, vertex_count + len(vertices),
+                                                       index_count, index_count + index_chunks[-1].size))
+            vertex_count += len(vertices)
+            index_count += index_chunks[-1].size
+        model_elements.append(geometry.ModelElement(fragments, element.name, element.material_name, 0, 0,
+                                                    element.material, 0, 0.))
+
+    binary_file = path.with_suffix('.bin').name
+    blob.write_blobs(path.with_suffix('.bin'), [vertex_chunks, index_chunks, [EMPTY_SKELETON]])
+    blobs = [blob.Blob(0, sum(chunk.nbytes for chunk in vertex_chunks)),
+             blob.Blob(1, sum(chunk.nbytes for chunk in index_chunks)),
+             blob.Blob(2, len(EMPTY_SKELETON))]
+    xdb.write_geometry(path, binary_file, [declaration], blobs, model_elements)
+    return path
@@ -0,0 +1,286 @@
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from . import blob
+from . import profiling
+from . import geometry
+from . import vertex
+
+RECORD_VERSION = 2
+
+# Top level tags which `XdbParser` exposes, everything else is dropped while parsing
+_BLOB_TAGS = ('vertexBuffer', 'indexBuffer', 'skeleton')
+_TEXTURE_TAGS = ('width', 'height', 'type')
+
+class XdbParser:
+    """
+        Parser of `.xdb` resource descriptors.
+
+        The file is read with `iterparse` into a compact record holding only the exposed fields.
+        With `cache` (an `XdbCache`) records of unchanged files are loaded instead of reparsed.
+    """
+
+    def __init__(self, path, cache=None):
+        self.path = path
+        with profiling.span('xdb.parse'):
+            self.record = cache.load(path) if cache is not None else extract_record(path)
+        self._vertex_declarations = None
+        self._index_buffer = None
+        self._vertex_buffer = None
+        self._model_elements = None
+        self._materials = None
+        self._skeleton = None
+
+    def is_geometry(self):
+        return self.record['vertexBuffer'] != None
+
+    def get_vertex_declarations(self):
+        if self._vertex_declarations == None:
+            self._vertex_declarations = []
+            for item in self.record['vertexDeclarations']:
+                components = {name: vertex.VertexComponent(vertex.VertexElementType[type], offset)
+                              for name, (type, offset) in item['components'].items()}
+                self._vertex_declarations.append(vertex.VertexDeclaration(stride=item['stride'], **components))
+        return self._vertex_declarations
+
+    def get_index_buffer(self):
+        if self._index_buffer == None:
+            self._index_buffer = blob.Blob(*self.record['indexBuffer'])
+        return self._index_buffer
+
+    def get_vertex_buffer(self):
+        if self._vertex_buffer == None:
+            self._vertex_buffer = blob.Blob(*self.record['vertexBuffer'])
+        return self._vertex_buffer
+
+    def get_skeleton(self):
+        if self._skeleton == None:
+            self._skeleton = blob.Blob(*self.record['skeleton'])
+        return self._skeleton
+
+    def get_model_elements(self):
+        if self._model_elements == None:
+            self._model_elements = []
+            self._materials = {}
+            for item in self.record['modelElements']:
+                lods = [geometry.GeometryFragment(*lod) for lod in item['lods']]
+                material = item['material']
+                material = geometry.Material(geometry.BlendEffect[material['blend_effect']], material['diffuse_texture'],
+                                             material['scroll_alpha'], material['scroll_rgb'],
+                                             material['transparency_texture'], material['transparent'],
+                                             material['use_fog'], material['u_translate_speed'],
+                                             material['visible'], material['v_translate_speed'])
+                self._model_elements.append(geometry.ModelElement(lods, item['name'], item['material_name'],
+                                                                  item['vertex_declaration_id'],
+                                                                  item['vertex_buffer_offset'], material,
+                                                                  item['skin_index'], item['virtual_offset']))
+                self._materials[item['material_name']] = material
+        return self._model_elements
+
+    def get_binary_file(self):
+        return self.record['binaryFile'].strip('/')
+
+    def get_texture_info(self):
+        return tuple(self.record['texture'])
+
+    @staticmethod
+    def _parse_material(xml):
+        return {
+            'blend_effect': xml.findtext('BlendEffect', default=geometry.BlendEffect.BLEND_EFFECT_ADD.name),
+            'diffuse_texture': (XdbParser._find_href(xml, 'diffuseTexture') or '').split('#')[0].strip('/'),
+            'scroll_alpha': XdbParser._to_bool(xml.findtext('scrollAlpha', default='true')),
+            'scroll_rgb': XdbParser._to_bool(xml.findtext('ScrollRGB', default='true')),
+            'transparency_texture': XdbParser._find_href(xml, 'transparencyTexture'),
+            'transparent': XdbParser._to_bool(xml.findtext('transparent', default='true')),
+            'use_fog': XdbParser._to_bool(xml.findtext('useFog', default='true')),
+            'u_translate_speed': float(xml.findtext('uTranslateSpeed', default=0.)),
+            'visible': XdbParser._to_bool(xml.findtext('visible', default='true')),
+            'v_translate_speed': float(xml.findtext('vTranslateSpeed', default=0.)),
+        }
+
+    @staticmethod
+    def _parse_model_element(xml):
+        return {
+            'lods': [XdbParser._parse_geometry_fragment(lod) for lod in xml.findall('lods/Item')],
+            'material': XdbParser._parse_material(xml.find('material')),
+            'material_name': xml.findtext('materialName'),
+            'name': xml.findtext('name'),
+            'skin_index': int(xml.findtext('skinIndex')),
+            'vertex_buffer_offset': int(xml.findtext('vertexBufferOffset')),
+            'vertex_declaration_id': int(xml.findtext('vertexDeclarationID')),
+            'virtual_offset': float(xml.findtext('virtualOffset')),
+        }
+
+    @staticmethod
+    def _parse_geometry_fragment(xml):
+        index_buffer_begin = int(xml.findtext('indexBufferBegin'))
+        index_buffer_end = int(xml.findtext('indexBufferEnd'))
+        vertex_buffer_begin = int(xml.findtext('vertexBufferBegin'))
+        vertex_buffer_end = int(xml.findtext('vertexBufferEnd'))
+        return (vertex_buffer_begin, vertex_buffer_end, index_buffer_begin, index_buffer_end)
+
+    @staticmethod
+    def _parse_vertex_declaration(xml):
+        components = {name: XdbParser._parse_vertex_component(xml.find(name)) for name in vertex.VERTEX_ATTRIBUTES}
+        return {'components': components, 'stride': int(xml.findtext('stride'))}
+
+    @staticmethod
+    def _parse_vertex_component(xml):
+        return (xml.findtext('type'), int(xml.findtext('offset')))
+
+    @staticmethod
+    def _parse_blob(xml):
+        return (int(xml.findtext('localID')), int(xml.findtext('size')))
+
+    @staticmethod
+    def _find_href(xml, key):
+        el = xml.find(key)
+        if el == None:
+            return None
+        else:
+            return el.attrib['href']
+
+    @staticmethod
+    def _to_bool(text):
+        return text.strip().lower() in ('y', 'yes', 't', 'true', 'on', '1')
+
+
+def extract_record(path):
+    """
+        Stream `.xdb` file and collect fields exposed by `XdbParser` into plain (JSON compatible) record.
+
+        Only top level elements are kept in memory, each one is dropped once it has been processed.
+    """
+    record = {
+        'tag': None,
+        'binaryFile': None,
+        'vertexDeclarations': [],
+        'vertexBuffer': None,
+        'indexBuffer': None,
+        'skeleton': None,
+        'modelElements': [],
+        'texture': None,
+    }
+    texture = {}
+    depth, root = 0, None
+    for event, element in ET.iterparse(str(path), events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+                record['tag'] = element.tag
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+        tag = element.tag
+        if tag == 'binaryFile':
+            record['binaryFile'] = element.get('href')
+        elif tag == 'vertexDeclarations':
+            record['vertexDeclarations'] = [XdbParser._parse_vertex_declaration(item) for item in element.findall('Item')]
+        elif tag in _BLOB_TAGS:
+            record[tag] = XdbParser._parse_blob(element)
+        elif tag == 'modelElements':
+            record['modelElements'] = [XdbParser._parse_model_element(item) for item in element.findall('Item')]
+        elif tag in _TEXTURE_TAGS:
+            texture[tag] = element.text
+        root.remove(element)
+
+    if all(tag in texture for tag in _TEXTURE_TAGS):
+        record['texture'] = (int(texture['width']), int(texture['height']), texture['type'])
+    return record
+
+
+def write_geometry(path, binary_file, vertex_declarations, blobs, model_elements):
+    """
+        Write geometry descriptor readable by `XdbParser`.
+
+        `binary_file` is the `.bin` href relative to the resource root, `blobs` the vertex buffer,
+        index buffer and skeleton `Blob`s, `model_elements` list of `ModelElement`s.
+    """
+    root = ET.Element('Geometry')
+    ET.SubElement(root, 'binaryFile', href='/' + Path(binary_file).as_posix().strip('/'))
+
+    declarations = ET.SubElement(root, 'vertexDeclarations')
+    for vertex_declaration in vertex_declarations:
+        item = ET.SubElement(declarations, 'Item')
+        for name in vertex.VERTEX_ATTRIBUTES:
+            vertex_component = getattr(vertex_declaration, name)
+            _write_fields(ET.SubElement(item, name), offset=vertex_component.offset, type=vertex_component.type.name)
+        _write_fields(item, stride=vertex_declaration.stride)
+
+    for tag, blob_ in zip(_BLOB_TAGS, blobs):
+        _write_fields(ET.SubElement(root, tag), localID=blob_.localId, size=blob_.size)
+
+    elements = ET.SubElement(root, 'modelElements')
+    for model_element in model_elements:
+        item = ET.SubElement(elements, 'Item')
+        lods = ET.SubElement(item, 'lods')
+        for lod in model_element.lods:
+            _write_fields(ET.SubElement(lods, 'Item'), vertexBufferBegin=lod.vertex_buffer_begin,
+                          vertexBufferEnd=lod.vertex_buffer_end, indexBufferBegin=lod.index_buffer_begin,
+                          indexBufferEnd=lod.index_buffer_end)
+        _write_material(ET.SubElement(item, 'material'), model_element.material)
+        _write_fields(item, materialName=model_element.material_name, name=model_element.name,
+                      skinIndex=model_element.skin_index, vertexBufferOffset=model_element.vertex_buffer_offset,
+                      vertexDeclarationID=model_element.vertex_declaration_id,
+                      virtualOffset=model_element.virtual_offset)
+
+    ET.ElementTree(root).write(str(path), encoding='utf-8', xml_declaration=True)
+
+def _write_material(xml, material):
+    diffuse = f'/{material.diffuse_texture}#xpointer(/Texture)' if len(material.diffuse_texture) > 0 else ''
+    _write_fields(xml, BlendEffect=material.blend_effect.name)
+    ET.SubElement(xml, 'diffuseTexture', href=diffuse)
+    _write_fields(xml, scrollAlpha=material.scroll_alpha, ScrollRGB=material.scroll_rgb)
+    if material.transparency_texture is not None:
+        ET.SubElement(xml, 'transparencyTexture', href=material.transparency_texture)
+    _write_fields(xml, transparent=material.transparent, useFog=material.use_fog,
+                  uTranslateSpeed=material.u_translate_speed, visible=material.visible,
+                  vTranslateSpeed=material.v_translate_speed)
+
+def _write_fields(xml, **fields):
+    for tag, value in fields.items():
+        ET.SubElement(xml, tag).text = str(value).lower() if isinstance(value, bool) else str(value)
+
+
+class XdbCache:
+    """
+        On-disk cache of `XdbParser` records, one JSON file per descriptor.
+
+        Entries are keyed by the absolute path and validated with file size and modification time.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def get_entry_path(self, path):
+        return self.directory / (hashlib.sha1(str(Path(path).resolve()).encode('utf-8')).hexdigest() + '.json')
+
+    def load(self, path):
+        stat = os.stat(path)
+        stamp = [RECORD_VERSION, stat.st_size, stat.st_mtime_ns]
+        entry_path = self.get_entry_path(path)
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as reader:
+                entry = json.load(reader)
+            if entry['stamp'] == stamp:
+                profiling.count('xdb cache hits')
+                return entry['record']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        record = extract_record(path)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            temp_path = entry_path.with_name(f'{entry_path.name}.{os.getpid()}.tmp')
+            with open(temp_path, 'w', encoding='utf-8') as writer:
+                json.dump({'path': str(path), 'stamp': stamp, 'record': record}, writer)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            pass
+        return record
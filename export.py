@@ -0,0 +1,153 @@
+import bpy
+
+import re
+from pathlib import Path
+
+import numpy as np
+
+from .core import vertex
+from .core import writer
+
+from bpy_extras.io_utils import ExportHelper
+from bpy.props import StringProperty, BoolProperty
+from bpy.types import Operator
+
+
+class ExportGeometry(Operator, ExportHelper):
+    """Save mesh objects as Allods Online geometry"""
+    bl_idname = "allods.export_geometry"
+    bl_label = "Export geometry"
+
+    filename_ext = ".xdb"
+    filter_glob: StringProperty(
+        default="*.xdb",
+        options={'HIDDEN'},
+    )
+
+    use_selection: BoolProperty(
+        name="Selected only",
+        description="Export only selected mesh objects",
+        default=True
+    )
+
+    def execute(self, context):
+        objects = context.selected_objects if self.use_selection else context.scene.objects
+        objects = [obj for obj in objects if obj.type == 'MESH']
+        if len(objects) == 0:
+            self.report({'ERROR'}, "No mesh objects to export")
+            return {'CANCELLED'}
+
+        elements = get_export_elements(objects, context.evaluated_depsgraph_get())
+        path = writer.write_model(Path(self.filepath), elements)
+        self.report({'INFO'}, f"Exported {len(elements)} model elements to {path.name}")
+        return {'FINISHED'}
+
+
+def get_export_elements(objects, depsgraph):
+    """
+        Group objects into model elements by name, `<element>_lod<N>` objects are LOD `N` of `<element>`.
+
+        Elements with fewer LODs than others are completed with their last LOD, because only LODs present
+        in every element are imported.
+    """
+    groups = {}
+    for obj in objects:
+        match = re.fullmatch(r'(.*)_lod(\d+)', obj.name)
+        name, lod_id = (match.group(1), int(match.group(2))) if match else (obj.name, 0)
+        groups.setdefault(name, {})[lod_id] = obj
+
+    lod_count = max(len(lods) for lods in groups.values())
+    elements = []
+    for name, lods in groups.items():
+        lod_objects = [lods[lod_id] for lod_id in sorted(lods)]
+        lod_objects += lod_objects[-1:] * (lod_count - len(lod_objects))
+        material = lod_objects[0].active_material
+        elements.append(writer.ExportElement(name, material.name if material is not None else name,
+                                             [get_mesh_arrays(obj, depsgraph) for obj in lod_objects]))
+    return elements
+
+
+def get_mesh_arrays(obj, depsgraph):
+    """
+        Triangulated evaluated mesh of `obj` in world space as `(VertexArray, triangles)`.
+
+        Attributes are read per face corner with `foreach_get`, corners with equal vertex, normal, UVs
+        and color are merged into one exported vertex.
+    """
+    evaluated = obj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+    try:
+        mesh.calc_loop_triangles()
+        if bpy.app.version < (4, 1, 0):
+            mesh.calc_normals_split()
+
+        corners = np.empty(3 * len(mesh.loop_triangles), dtype=np.int32)
+        mesh.loop_triangles.foreach_get('loops', corners)
+        loop_vertices = np.empty(len(mesh.loops), dtype=np.int32)
+        mesh.loops.foreach_get('vertex_index', loop_vertices)
+        positions = np.empty(3 * len(mesh.vertices), dtype=np.float32)
+        mesh.vertices.foreach_get('co', positions)
+        normals = np.empty(3 * len(mesh.loops), dtype=np.float32)
+        if bpy.app.version >= (4, 1, 0):
+            mesh.corner_normals.foreach_get('vector', normals)
+        else:
+            mesh.loops.foreach_get('normal', normals)
+
+        matrix = np.array(obj.matrix_world, dtype=np.float64)
+        normal_matrix = np.linalg.inv(matrix[:3, :3]).T
+        columns = {
+            'position': positions.reshape(-1, 3)[loop_vertices] @ matrix[:3, :3].T + matrix[:3, 3],
+            'normal': normals.reshape(-1, 3) @ normal_matrix.T,
+        }
+        for i, uv_layer in enumerate(mesh.uv_layers[:2]):
+            uvs = np.empty(2 * len(mesh.loops), dtype=np.float32)
+            uv_layer.data.foreach_get('uv', uvs)
+            columns[f'texcoord{i}'] = uvs.reshape(-1, 2)
+        colors = get_loop_colors(mesh, loop_vertices)
+        if colors is not None:
+            columns['color'] = colors
+
+        # Corners sharing all attributes become one vertex
+        keys = np.hstack([loop_vertices[corners, None]] + [column[corners] for column in columns.values()])
+        _, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+        arrays = {name: column[corners][first].astype(np.float32) for name, column in columns.items()}
+        lengths = np.linalg.norm(arrays['normal'], axis=1, keepdims=True)
+        arrays['normal'] = np.divide(arrays['normal'], lengths, out=np.zeros_like(arrays['normal']), where=lengths > 0)
+        return vertex.VertexArray(**arrays), inverse.reshape(-1, 3)
+    finally:
+        evaluated.to_mesh_clear()
+
+
+def get_loop_colors(mesh, loop_vertices):
+    """
+        Active color attribute (sRGB) expanded to face corners as (N, 4) array, `None` when there is none.
+    """
+    if bpy.app.version >= (3, 4, 0):
+        attribute = mesh.color_attributes.active_color
+        if attribute is None:
+            return None
+        colors = np.empty(4 * len(attribute.data), dtype=np.float32)
+        attribute.data.foreach_get('color_srgb', colors)
+        colors = colors.reshape(-1, 4)
+        return colors[loop_vertices] if attribute.domain == 'POINT' else colors
+
+    if len(mesh.vertex_colors) == 0:
+        return None
+    colors = np.empty(4 * len(mesh.loops), dtype=np.float32)
+    mesh.vertex_colors.active.data.foreach_get('color', colors)
+    return colors.reshape(-1, 4)
+
+
+def menu_func_export(self, context):
+    self.layout.operator(ExportGeometry.bl_idname,
+                         text="Allods Geometry (.xdb)")
+
+
+def register():
+    bpy.utils.register_class(ExportGeometry)
+    bpy.types.TOPBAR_MT_file_export.append(menu_func_export)
+
+
+def unregister():
+    bpy.utils.unregister_class(ExportGeometry)
+    bpy.types.TOPBAR_MT_file_export.remove(menu_func_export)
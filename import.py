@@ -1,32 +1,26 @@
 import bpy
-import mathutils
 
-import io
+import time
+import traceback
 from pathlib import Path
-import itertools
 
-from struct import unpack
-
-from . import xdb
-from . import blob
-from . import vertex
-from . import skeleton
-from . import texture
+from .core import xdb
+from .core import model
+from .core import skeleton
+from .core import cache
+from .core import workers
+from .core import index
+from .core import profiling
+from . import builder
+from . import batch
 
 from bpy_extras.io_utils import ImportHelper
-from bpy.props import StringProperty, BoolProperty, EnumProperty
-from bpy.types import Operator
+from bpy.props import StringProperty, BoolProperty, EnumProperty, IntProperty, CollectionProperty
+from bpy.types import Operator, OperatorFileListElement
 
 
-class ImportGeometry(Operator, ImportHelper):
-    """Load geometry files from Allods Online"""
-    bl_idname = "allods.import_geometry"
-    bl_label = "Import geometry"
+class ImportOptions:
 
-    filter_glob: StringProperty(
-        default="*.xdb",
-        options={'HIDDEN'},
-    )
     lods_load: bpy.props.EnumProperty(
         name="Load LODs",
         description="Which LODs should be loaded",
@@ -40,129 +34,302 @@ class ImportGeometry(Operator, ImportHelper):
     )
 
     slots_load: bpy.props.BoolProperty(name="Load bones for slots", default=False)
+    skin_load: bpy.props.BoolProperty(
+        name="Load skin weights",
+        description="Create vertex groups from skin weights and bind meshes to the armature",
+        default=True
+    )
+    normals_load: bpy.props.BoolProperty(
+        name="Load normals",
+        description="Keep normals stored in the model as custom normals. Blender computes them when disabled, which is faster",
+        default=True
+    )
+
+    update_existing: bpy.props.BoolProperty(
+        name="Update previous import",
+        description="When the file was imported before, rebuild only parts of it which changed instead of "
+                    "importing another copy",
+        default=True
+    )
+
+    texture_mode: bpy.props.EnumProperty(
+        name="Textures",
+        description="How textures are brought into Blender",
+        items=[
+            ("MEMORY", "Decode in memory", "Decode DXT textures directly into images packed in the .blend file"),
+            ("DDS", "DDS files", "Convert textures to .dds files in the texture cache and load them from there")
+        ],
+        default="MEMORY"
+    )
+
+    texture_cache_dir: StringProperty(
+        name="Texture cache",
+        description="Directory for converted textures and parsed descriptors. Blender user data directory is used when empty",
+        subtype='DIR_PATH',
+        default=""
+    )
+    texture_cache_size: IntProperty(
+        name="Texture cache size (MB)",
+        description="Least recently used textures are removed from the cache above this size",
+        min=0,
+        default=1024
+    )
+    data_root: StringProperty(
+        name="Game data",
+        description="Unpacked game data folder indexed with `Update Allods resource index`. "
+                    "Textures are resolved through its index when set",
+        subtype='DIR_PATH',
+        default=""
+    )
+
+    def get_lod_ids(self):
+        if self.lods_load != "LODALL":
+            return [int(self.lods_load[3:4])]
+        return None
+
+    def get_textures_in_memory(self):
+        return self.texture_mode == "MEMORY"
+
+    def get_texture_cache(self):
+        return cache.TextureCache(get_cache_dir(self.texture_cache_dir), self.texture_cache_size * 1024 * 1024)
+
+    def get_xdb_cache(self):
+        return xdb.XdbCache(get_cache_dir(self.texture_cache_dir) / 'xdb')
+
+    def get_resource_index(self):
+        if len(self.data_root) == 0:
+            return None
+        resource_index = get_resource_index(self.texture_cache_dir, self.data_root)
+        if not resource_index.exists():
+            print(f'Resource index of {resource_index.root} not found, run `Update Allods resource index` first')
+            return None
+        return resource_index
+
+
+class ImportGeometry(Operator, ImportHelper, ImportOptions):
+    """Load geometry files from Allods Online"""
+    bl_idname = "allods.import_geometry"
+    bl_label = "Import geometry"
+
+    filter_glob: StringProperty(
+        default="*.xdb",
+        options={'HIDDEN'},
+    )
+
+    parallel_textures: BoolProperty(
+        name="Convert textures in parallel",
+        description="Convert textures in background processes while geometry is being decoded",
+        default=True
+    )
+    profile: BoolProperty(
+        name="Profile import",
+        description="Time import stages and report them in the info log",
+        default=False
+    )
+    trace_path: StringProperty(
+        name="Trace file",
+        description="Also write profiled stages as Chrome trace JSON to this file",
+        subtype='FILE_PATH',
+        default=""
+    )
+
+    background: BoolProperty(
+        name="Import in background",
+        description="Decode in a background process and build the model in small steps, so Blender stays "
+                    "responsive. Press Esc to cancel, decoding already running in the background finishes "
+                    "first and its result is dropped",
+        default=False
+    )
+
+    # Seconds of datablock building done per timer tick of background import
+    BUILD_STEP_TIME = 0.05
+
+    _job = None
+    _texture_converter = None
+    _steps = None
+    _timer = None
+    _collection = None
+    _created = False
 
     def execute(self, context):
-        # Load & parsing data
+        if self.background:
+            return self.start_background_import(context)
+        if not self.profile:
+            return self.import_geometry()
+
+        profiling.start()
+        try:
+            with profiling.span('import'):
+                result = self.import_geometry()
+        finally:
+            profile = profiling.stop()
+        for line in profile.format_summary():
+            self.report({'INFO'}, line)
+        if len(self.trace_path) > 0:
+            profile.write_trace(bpy.path.abspath(self.trace_path))
+        return result
+
+    def import_geometry(self):
         path = Path(self.filepath)
+        xdb_cache = self.get_xdb_cache()
+        parser = xdb.XdbParser(path, xdb_cache)
+        basedir = model.get_base_dir(path.with_suffix('.bin'), parser.get_binary_file())
+        print(f'Resource dir: {basedir}')
 
-        parser = xdb.XdbParser(path)
-        bin_parser = blob.BinParser(path.with_suffix('.bin'))
+        # Start texture conversion first, so it runs alongside geometry decoding
+        with cache.TextureConverter(self.get_texture_cache(), basedir, None if self.parallel_textures else 0,
+                                    xdb_cache, self.get_resource_index(),
+                                    self.get_textures_in_memory()) as texture_converter:
+            texture_converter.submit(model_element.material.diffuse_texture
+                                     for model_element in parser.get_model_elements()
+                                     if len(model_element.material.diffuse_texture) > 0)
+
+            with profiling.span('decode'):
+                model_data = model.load_model(path, self.get_lod_ids(), parser=parser)
+            if len(model_data.lod_ids) == 0:
+                self.report({'ERROR'}, "No LODs to be found. Try to change `Load LODs` param.")
+                return {'CANCELLED'}
+
+            with profiling.span('build'):
+                builder.build_model(model_data, texture_converter.get_texture, self.slots_load, self.skin_load,
+                                    self.normals_load, self.update_existing)
+        return {'FINISHED'}
 
-        basedir = get_base_dir(path.with_suffix('.bin'), parser.get_binary_file())
-        print(f'Resource dir: {basedir}')
+    def start_background_import(self, context):
+        if self.profile:
+            profiling.start()
+        path = Path(self.filepath)
+        xdb_cache = self.get_xdb_cache()
+        parser = xdb.XdbParser(path, xdb_cache)
+        basedir = model.get_base_dir(path.with_suffix('.bin'), parser.get_binary_file())
+        # Textures are converted by their own jobs, alongside geometry decoding and each other
+        self._texture_converter = cache.TextureConverter(self.get_texture_cache(), basedir, None, xdb_cache,
+                                                         self.get_resource_index(), self.get_textures_in_memory())
+        self._texture_converter.submit(model_element.material.diffuse_texture
+                                       for model_element in parser.get_model_elements()
+                                       if len(model_element.material.diffuse_texture) > 0)
+        self._job = workers.submit(model.load_model_job, path, self.get_lod_ids(), None, xdb_cache)
+        self._steps, self._collection = None, None
+        self._done, self._total = 0, 1
+
+        window_manager = context.window_manager
+        window_manager.progress_begin(0, 1)
+        self._timer = window_manager.event_timer_add(0.05, window=context.window)
+        window_manager.modal_handler_add(self)
+        context.workspace.status_text_set(f"Decoding {Path(self.filepath).name}... (Esc to cancel)")
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.finish_background_import(context, cancelled=True)
+            self.report({'WARNING'}, "Import cancelled")
+            return {'CANCELLED'}
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        try:
+            if self._steps is None:
+                # Materials are built with the model, so wait for its textures too
+                if not self._job.done() or not self._texture_converter.done():
+                    return {'PASS_THROUGH'}
+                model_data, decode_time = self._job.result()
+                if len(model_data.lod_ids) == 0:
+                    self.finish_background_import(context, cancelled=True)
+                    self.report({'ERROR'}, "No LODs to be found. Try to change `Load LODs` param.")
+                    return {'CANCELLED'}
+                print(f'Decoded {model_data.path} in {decode_time:.3f}s')
+                # Collection of an earlier import is only updated, so it's kept on cancel
+                self._created = (not self.update_existing
+                                 or builder.find_model_collection(builder.get_source(model_data)) is None)
+                self._steps = builder.build_model_steps(model_data, self._texture_converter.get_texture,
+                                                        self.slots_load, self.skin_load, self.normals_load,
+                                                        self.update_existing)
+                self._done, self._total = 1, 1 + builder.get_build_step_count(model_data)
+
+            # Build for a short while only, so the UI keeps redrawing between ticks
+            deadline = time.perf_counter() + self.BUILD_STEP_TIME
+            while time.perf_counter() < deadline:
+                self._collection = next(self._steps)
+                self._done += 1
+        except StopIteration:
+            self.finish_background_import(context)
+            return {'FINISHED'}
+        except Exception as e:
+            traceback.print_exc()
+            self.finish_background_import(context, cancelled=True)
+            self.report({'ERROR'}, f"Import failed: {e}")
+            return {'CANCELLED'}
+
+        context.window_manager.progress_update(self._done / self._total)
+        context.workspace.status_text_set(f"Building {Path(self.filepath).name}: "
+                                          f"{self._done} of {self._total} steps (Esc to cancel)")
+        return {'PASS_THROUGH'}
+
+    def finish_background_import(self, context, cancelled=False):
+        window_manager = context.window_manager
+        window_manager.event_timer_remove(self._timer)
+        window_manager.progress_end()
+        context.workspace.status_text_set(None)
+
+        self._texture_converter.close()
+        if cancelled:
+            self._job.cancel()
+            if self._steps is not None:
+                self._steps.close()
+            if self._collection is not None and self._created:
+                builder.remove_collection(self._collection)
+        self._job, self._texture_converter, self._steps, self._timer = None, None, None, None
+        self._collection = None
+
+        profile = profiling.stop()
+        if profile is not None:
+            for line in profile.format_summary():
+                self.report({'INFO'}, line)
+            if len(self.trace_path) > 0:
+                profile.write_trace(bpy.path.abspath(self.trace_path))
+
+
+class ImportGeometryBatch(Operator, ImportHelper, ImportOptions):
+    """Load many geometry files from Allods Online, decoding them in parallel"""
+    bl_idname = "allods.import_geometry_batch"
+    bl_label = "Import geometry (batch)"
 
-        vertex_bin_converters = []
-        for vertex_declaration in parser.get_vertex_declarations():
-            vertex_bin_converters.append(vertex.VertexBinConverter(vertex_declaration))
+    filter_glob: StringProperty(
+        default="*.xdb",
+        options={'HIDDEN'},
+    )
+    files: CollectionProperty(type=OperatorFileListElement, options={'HIDDEN', 'SKIP_SAVE'})
+    directory: StringProperty(subtype='DIR_PATH', options={'HIDDEN', 'SKIP_SAVE'})
 
-        vertex_bin_converter = vertex_bin_converters[0]
-        vertex_buffer = bin_parser.get_buffer(parser.get_vertex_buffer())
-        vertices = vertex_bin_converter.bin_to_vertices(vertex_buffer)
-        index_buffer = bin_parser.get_buffer(parser.get_index_buffer())
-        indices = [(unpack('HHH', index_buffer[i*6:i*6+6])) for i in range(len(index_buffer) // 6)]
-        skeleton_buffer = bin_parser.get_buffer(parser.get_skeleton())
-        skeleton_parser = skeleton.BoneBinParser(skeleton_buffer)
-        bones = skeleton_parser.get_bones()
-        #print_bones(bones)
+    recursive: BoolProperty(
+        name="Include subfolders",
+        description="When no file is selected, import models from the whole folder tree",
+        default=False
+    )
+    workers: IntProperty(
+        name="Worker processes",
+        description="Number of processes decoding files. All CPU cores are used when 0",
+        min=0,
+        default=0
+    )
 
-        if self.lods_load != "LODALL":
-            lods_filter = lambda i: int(self.lods_load[3:4]) == i
-        else:
-            lods_filter = lambda i: True
-
-        # Create LODs collections
-        model_name = str(path.name).split('.')[0]
-        collection = bpy.data.collections.new(f"{model_name}")
-        bpy.context.scene.collection.children.link(collection)
-        lods_collections = {}
-        for lod_id in range(min(map(lambda e: len(e.lods), parser.get_model_elements()))):
-            if not lods_filter(lod_id):
-                continue
-            lod_collection = bpy.data.collections.new(f"{model_name}_lod{lod_id}")
-            collection.children.link(lod_collection)
-            lods_collections[lod_id] = lod_collection
-
-        if len(lods_collections) == 0:
-            self.report({"IMPORT ERROR"}, "No LODs to be found. Try to change `Load LODs` param.")
-            return {"CANCELLED"}
-
-        # Create model elements
-        for model_element in parser.get_model_elements():
-            # Load material & texture
-            mat = bpy.data.materials.new(name=model_element.material_name)
-            mat.blend_method = 'BLEND'
-            if len(model_element.material.diffuse_texture) > 0:
-                texture_resource = get_resource_path(model_element.material.diffuse_texture, basedir)
-                texture_parser = xdb.XdbParser(texture_resource)
-                texture_path = get_resource_path(texture_parser.get_binary_file(), basedir).with_suffix('.dds')
-                print(f'Loading texture: {texture_path}')
-                if not Path.exists(texture_path):
-                    texture_data = texture.TextureData(texture_path.with_suffix('.bin'),
-                                                    *texture_parser.get_texture_info())
-                    texture_data.save_to(texture_path)
-
-                mat.use_nodes = True
-                mat.node_tree.nodes.clear()
-                mat_output = mat.node_tree.nodes.new('ShaderNodeOutputMaterial')
-                principled_node = mat.node_tree.nodes.new('ShaderNodeBsdfPrincipled')
-                texture_node = mat.node_tree.nodes.new('ShaderNodeTexImage')
-                texture_node.image = bpy.data.images.load(filepath=str(texture_path))
-                mat.node_tree.links.new(texture_node.outputs[0], principled_node.inputs[0])
-                mat.node_tree.links.new(texture_node.outputs[1], principled_node.inputs[21])
-                mat.node_tree.links.new(principled_node.outputs[0], mat_output.inputs[0])
-
-            # Building lods
-            for i, lod in enumerate(model_element.lods):
-                if not lods_filter(i):
-                    continue
-                lod_indices = indices[lod.index_buffer_begin//3:lod.index_buffer_end//3]
-                lod_vertices = [vertices[i] for i in set(itertools.chain.from_iterable(lod_indices))]
-                lod_indices_vertex = [(lod_vertices.index(vertices[i[0]]), lod_vertices.index(vertices[i[1]]), lod_vertices.index((vertices[i[2]]))) for i in lod_indices] 	
-                mesh = bpy.data.meshes.new(model_element.name + '_lod' + str(i))
-                mesh.from_pydata([v.position for v in lod_vertices], [], lod_indices_vertex)
-                mesh.update()
-                uv_layer = mesh.uv_layers.new()
-                for face in mesh.polygons:
-                    for vert_idx, loop_idx in zip(face.vertices, face.loop_indices):
-                        uv_layer.data[loop_idx].uv = lod_vertices[vert_idx].texcoord0
-                obj = bpy.data.objects.new(model_element.name + '_lod' + str(i), mesh)
-                obj.data.materials.append(mat)
-                lods_collections[i].objects.link(obj)
-        
-        # Create armature
-        if len(bones) > 0:
-            armature = bpy.data.armatures.new("skeleton")
-            armature_obj = bpy.data.objects.new("skeleton", armature)
-            collection.objects.link(armature_obj)
-
-            bpy.context.view_layer.objects.active = armature_obj
-            bpy.ops.object.mode_set(mode='EDIT')
-
-            bones_obj = {}
-            for i, bone in enumerate(bones):
-                if not self.slots_load and "Slot" in bone.name:
-                    continue
-
-                vector = mathutils.Vector((0.0, 0.0, 0.0, 1.0))
-                current_bone = bone
-                while current_bone.parent != 65535:
-                    vector = vector @ current_bone.local_matrix
-                    current_bone = bones[current_bone.parent]
-
-                world = bone.inverted_world_matrix.inverted()
-
-                bone_obj = armature_obj.data.edit_bones.new(bone.name)
-                bone_obj.tail = world[3][0:3]
-                bones_obj[i] = bone_obj
-
-            for i, bone in enumerate(bones):
-                if not self.slots_load and "Slot" in bone.name:
-                    continue
-                if bone.parent != 65535:
-                    bones_obj[i].head = bones_obj[bone.parent].tail
-                    bones_obj[i].parent = bones_obj[bone.parent]
-
-            bpy.ops.object.mode_set(mode='OBJECT')
+    def execute(self, context):
+        paths = [Path(self.directory) / file.name for file in self.files if len(file.name) > 0]
+        if len(paths) == 0:
+            paths = batch.find_models(self.directory, self.recursive)
+
+        results = batch.import_files(paths, self.get_lod_ids(), self.slots_load,
+                                     self.get_texture_cache(), self.workers or None, self.get_xdb_cache(),
+                                     self.get_resource_index(), self.skin_load, self.normals_load,
+                                     self.update_existing, self.get_textures_in_memory())
+
+        skipped = [result for result in results if isinstance(result.error, model.NotGeometryError)]
+        failed = [result for result in results if result.error is not None and result not in skipped]
+        for result in failed:
+            self.report({'WARNING'}, str(result))
+        total_time = sum(result.decode_time + result.build_time for result in results)
+        self.report({'INFO'}, f"Imported {len(results) - len(failed) - len(skipped)} of {len(paths)} files "
+                              f"({len(failed)} failed, {len(skipped)} skipped), {total_time:.2f}s total")
         return {'FINISHED'}
 
 
@@ -196,23 +363,70 @@ def print_bones(bones):
         print_req(roots)
 
 
-def get_base_dir(filepath, relative_part):
-    relative_part = Path(relative_part)
-    return Path(filepath).joinpath(*['..' for _ in range(len(relative_part.parts))]).resolve()
+class UpdateResourceIndex(Operator):
+    """Scan unpacked Allods Online data folder and update its resource index"""
+    bl_idname = "allods.update_index"
+    bl_label = "Update Allods resource index"
+
+    directory: StringProperty(subtype='DIR_PATH')
+    texture_cache_dir: StringProperty(
+        name="Cache",
+        description="Directory where the index is stored. Blender user data directory is used when empty",
+        subtype='DIR_PATH',
+        default=""
+    )
+
+    def invoke(self, context, event):
+        context.window_manager.fileselect_add(self)
+        return {'RUNNING_MODAL'}
 
-def get_resource_path(resource_path, basedir):
-    return Path(basedir) / Path(resource_path)
+    def execute(self, context):
+        resource_index = get_resource_index(self.texture_cache_dir, self.directory)
+        try:
+            indexed, removed = resource_index.update()
+        finally:
+            resource_index.close()
+        self.report({'INFO'}, f"Indexed {indexed} resources, removed {removed}")
+        return {'FINISHED'}
+
+
+def get_default_cache_dir():
+    return Path(bpy.utils.user_resource('DATAFILES', path='allods_textures'))
+
+def get_cache_dir(directory):
+    # Blend file relative paths (`//cache`) are resolved here, they mean nothing outside of Blender
+    return Path(bpy.path.abspath(directory)) if len(directory) > 0 else get_default_cache_dir()
+
+def get_resource_index(cache_dir, data_root):
+    """
+        Index of game data folder `data_root`, blend file relative paths are resolved first, so every
+        spelling of the same folder shares one index.
+    """
+    data_root = Path(bpy.path.abspath(data_root))
+    return index.ResourceIndex(index.get_index_path(get_cache_dir(cache_dir), data_root), data_root)
 
 def menu_func_import(self, context):
     self.layout.operator(ImportGeometry.bl_idname,
                          text="Allods Geometry (.bin)")
+    self.layout.operator(ImportGeometryBatch.bl_idname,
+                         text="Allods Geometry, batch (.bin)")
+    self.layout.operator(UpdateResourceIndex.bl_idname,
+                         text="Allods resource index")
 
 
 def register():
+    if bpy.app.version < (2, 91, 0):
+        # `sys.executable` is the Blender binary there, workers need the bundled interpreter
+        workers.set_executable(bpy.app.binary_path_python)
     bpy.utils.register_class(ImportGeometry)
+    bpy.utils.register_class(ImportGeometryBatch)
+    bpy.utils.register_class(UpdateResourceIndex)
     bpy.types.TOPBAR_MT_file_import.append(menu_func_import)
 
 
 def unregister():
+    workers.shutdown()
     bpy.utils.unregister_class(ImportGeometry)
+    bpy.utils.unregister_class(ImportGeometryBatch)
+    bpy.utils.unregister_class(UpdateResourceIndex)
     bpy.types.TOPBAR_MT_file_import.remove(menu_func_import)